@@ -0,0 +1,195 @@
+"""
+Dashboard aggregates for Cost Calculation System
+Keeps per-user cost and tour totals in the user_summary table, and
+per-day cost totals in cost_daily_total, so the dashboard and reports
+never scan the cost or tour_program tables. Cost totals are sums of
+amount_base, in the base currency.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _upsert_increment(connection, table, keys, increments):
+    """Insert a row or add ``increments`` to the existing row with the same keys"""
+    now = datetime.now(timezone.utc)
+    values = {**keys, **increments, 'updated_at': now}
+    updates = {name: table.c[name] + delta for name, delta in increments.items()}
+    updates['updated_at'] = now
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        upsert = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table).values(**values)
+        connection.execute(upsert.on_conflict_do_update(index_elements=[table.c[name] for name in keys], set_=updates))
+        return
+
+    condition = [table.c[name] == value for name, value in keys.items()]
+    result = connection.execute(update(table).where(*condition).values(**updates))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**values))
+
+
+def apply_delta(connection, summary, user_id, cost_count=0, cost_total=0, tour_count=0):
+    """Add deltas to one user's summary row, creating it if needed.
+
+    Runs on the caller's connection so the change commits or rolls back
+    together with the rows that caused it.
+    """
+    if not (cost_count or cost_total or tour_count):
+        return
+    _upsert_increment(connection, summary, {'user_id': user_id}, {
+        'cost_count': cost_count,
+        'cost_total': Decimal(str(cost_total or 0)),
+        'tour_count': tour_count,
+    })
+
+
+def touch(connection, summary, user_id):
+    """Mark a user's data as changed without changing their totals"""
+    _upsert_increment(connection, summary, {'user_id': user_id}, {})
+
+
+def touch_all(connection, summary, user_ids=None):
+    """Mark the data of every user, or of the users selected by ``user_ids``, as changed"""
+    statement = update(summary).values(updated_at=datetime.now(timezone.utc))
+    if user_ids is not None:
+        statement = statement.where(summary.c.user_id.in_(user_ids))
+    connection.execute(statement)
+
+
+def apply_daily_delta(connection, daily, user_id, day, category, cost_count=0, cost_total=0):
+    """Add deltas to the (user, day, category) cost rollup used by reports"""
+    if not (cost_count or cost_total):
+        return
+    _upsert_increment(connection, daily, {'user_id': user_id, 'day': day, 'category': category or ''}, {
+        'cost_count': cost_count,
+        'cost_total': Decimal(str(cost_total or 0)),
+    })
+
+
+def rebuild(connection, summary, daily, users, costs, tours):
+    """Recompute the summary and daily rollup tables from the base tables"""
+    cost_totals = (
+        select(costs.c.user_id, func.count().label('cost_count'),
+               func.coalesce(func.sum(costs.c.amount_base), 0).label('cost_total'))
+        .group_by(costs.c.user_id)
+        .subquery()
+    )
+    tour_totals = (
+        select(tours.c.user_id, func.count().label('tour_count'))
+        .group_by(tours.c.user_id)
+        .subquery()
+    )
+    rows = (
+        select(
+            users.c.id,
+            func.coalesce(cost_totals.c.cost_count, 0),
+            func.coalesce(cost_totals.c.cost_total, 0),
+            func.coalesce(tour_totals.c.tour_count, 0),
+            literal(datetime.now(timezone.utc), summary.c.updated_at.type),
+        )
+        .select_from(users)
+        .outerjoin(cost_totals, cost_totals.c.user_id == users.c.id)
+        .outerjoin(tour_totals, tour_totals.c.user_id == users.c.id)
+    )
+    connection.execute(delete(summary))
+    connection.execute(insert(summary).from_select(
+        ['user_id', 'cost_count', 'cost_total', 'tour_count', 'updated_at'], rows))
+
+    category = func.coalesce(costs.c.category, '')
+    daily_rows = (
+        select(costs.c.user_id, costs.c.date, category, func.count(), func.sum(costs.c.amount_base),
+               literal(datetime.now(timezone.utc), daily.c.updated_at.type))
+        .group_by(costs.c.user_id, costs.c.date, category)
+    )
+    connection.execute(delete(daily))
+    connection.execute(insert(daily).from_select(
+        ['user_id', 'day', 'category', 'cost_count', 'cost_total', 'updated_at'], daily_rows))
+    return connection.execute(select(func.count()).select_from(summary)).scalar()
+
+
+def user_totals(session, summary_model, user_id):
+    """Return (cost_total, cost_count, tour_count) for one user"""
+    row = session.get(summary_model, user_id)
+    if row is None:
+        return Decimal('0'), 0, 0
+    return row.cost_total, row.cost_count, row.tour_count
+
+
+def data_version(session, summary_model, user_id):
+    """Version of a user's data: when their summary row was last written.
+
+    Every ORM write to the user's costs and tours updates the row in the
+    same transaction, so the version is shared by every process.
+    """
+    row = session.get(summary_model, user_id)
+    return row.updated_at if row is not None else None
+
+
+def changed_value(target, attribute):
+    """Return (old, new) for an attribute changed in the current flush"""
+    history = inspect(target).attrs[attribute].history
+    old = history.deleted[0] if history.deleted else getattr(target, attribute)
+    new = history.added[0] if history.added else getattr(target, attribute)
+    return old, new
+
+
+def keep_history(*attributes):
+    """Load each attribute's old value when it is assigned, so changed_value() sees it after the flush"""
+    for attribute in attributes:
+        event.listen(attribute, 'set', lambda target, value, oldvalue, initiator: None, active_history=True)
+
+
+def register_listeners(summary_model, daily_model, cost_model, tour_model):
+    """Keep the summary tables in step with ORM writes to costs and tours.
+
+    Every write also moves the owner's updated_at, which data_version() reads.
+
+    Bulk Core inserts bypass these hooks and must call apply_delta() and
+    apply_daily_delta() themselves.
+    """
+    summary = summary_model.__table__
+    daily = daily_model.__table__
+
+    def add_cost(connection, user_id, day, category, amount, sign):
+        amount = Decimal(str(amount)) * sign
+        apply_delta(connection, summary, user_id, cost_count=sign, cost_total=amount)
+        apply_daily_delta(connection, daily, user_id, day, category, cost_count=sign, cost_total=amount)
+
+    @event.listens_for(cost_model, 'after_insert')
+    def cost_inserted(mapper, connection, target):
+        add_cost(connection, target.user_id, target.date, target.category, target.amount_base, 1)
+
+    @event.listens_for(cost_model, 'after_delete')
+    def cost_deleted(mapper, connection, target):
+        add_cost(connection, target.user_id, target.date, target.category, target.amount_base, -1)
+
+    @event.listens_for(cost_model, 'after_update')
+    def cost_updated(mapper, connection, target):
+        changes = [changed_value(target, name) for name in ('user_id', 'date', 'category', 'amount_base')]
+        if all(old == new for old, new in changes):
+            touch(connection, summary, target.user_id)
+            return
+        (old_user, new_user), (old_date, new_date), (old_category, new_category), (old_amount, new_amount) = changes
+        add_cost(connection, old_user, old_date, old_category, old_amount, -1)
+        add_cost(connection, new_user, new_date, new_category, new_amount, 1)
+
+    @event.listens_for(tour_model, 'after_insert')
+    def tour_inserted(mapper, connection, target):
+        apply_delta(connection, summary, target.user_id, tour_count=1)
+
+    @event.listens_for(tour_model, 'after_delete')
+    def tour_deleted(mapper, connection, target):
+        apply_delta(connection, summary, target.user_id, tour_count=-1)
+
+    @event.listens_for(tour_model, 'after_update')
+    def tour_updated(mapper, connection, target):
+        old_user, new_user = changed_value(target, 'user_id')
+        if old_user != new_user:
+            apply_delta(connection, summary, old_user, tour_count=-1)
+            apply_delta(connection, summary, new_user, tour_count=1)
+        else:
+            touch(connection, summary, new_user)
@@ -0,0 +1,234 @@
+"""
+Static asset pipeline for Cost Calculation System
+Vendors the third-party CSS/JS the layouts used to load from CDNs, minifies
+the app's own assets, and writes content-hashed copies plus gzip/brotli
+variants to static/dist with a manifest. asset_url() emits the hashed names
+and the static route serves the precompressed variants with immutable
+caching headers.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import threading
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+# Optional: brotli variants and JS minification are skipped without these packages
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Files under static/ that go through the pipeline
+SOURCE_DIRS = ('css', 'js', 'img', 'vendor')
+HASHED_EXTENSIONS = ('.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.woff', '.woff2', '.ttf', '.eot')
+COMPRESSED_EXTENSIONS = ('.css', '.js', '.svg', '.ttf', '.eot')
+
+# Vendored path under static/ -> CDN URL it is fetched from (and falls back to)
+VENDOR_ASSETS = {
+    'vendor/bootstrap/css/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/jquery/jquery.min.js': 'https://code.jquery.com/jquery-3.7.0.min.js',
+    'vendor/fontawesome/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+}
+for _font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility'):
+    for _extension in ('woff2', 'ttf'):
+        VENDOR_ASSETS[f'vendor/fontawesome/webfonts/{_font}.{_extension}'] = (
+            f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/{_font}.{_extension}')
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Manifest path -> (mtime, manifest); re-read when a build replaces the file
+_manifests = {}
+_manifest_lock = threading.Lock()
+
+
+# Build
+def fetch_vendor_assets(static_folder, force=False):
+    """Download vendored CDN assets that are not in static/vendor yet"""
+    fetched = []
+    for path, url in VENDOR_ASSETS.items():
+        target = os.path.join(static_folder, path)
+        if os.path.exists(target) and not force:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response, open(target, 'wb') as output:
+            shutil.copyfileobj(response, output)
+        fetched.append(path)
+    return fetched
+
+
+def minify_css(text):
+    """Strip comments and collapse whitespace in a stylesheet"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify(path, data):
+    """Minify the app's own CSS/JS; already minified vendor files pass through"""
+    if path.startswith('vendor/') or '.min.' in path:
+        return data
+    if path.endswith('.css'):
+        return minify_css(data.decode('utf-8')).encode('utf-8')
+    if path.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(data.decode('utf-8')).encode('utf-8')
+    return data
+
+
+def hashed_name(path, data):
+    root, extension = posixpath.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+
+
+def _rewrite_css_urls(path, text, manifest):
+    """Point url() references in a stylesheet at the hashed files"""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        reference = match.group(2)
+        if reference.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        target, suffix = re.match(r'([^?#]*)(.*)', reference).groups()
+        resolved = posixpath.normpath(posixpath.join(directory, target))
+        if resolved not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(manifest[resolved], posixpath.join(DIST_DIR, directory))
+        return f'url({relative}{suffix})'
+
+    return CSS_URL.sub(replace, text)
+
+
+def _write_compressed(target, data):
+    with open(target + '.gz', 'wb') as output:
+        output.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(target + '.br', 'wb') as output:
+            output.write(brotli.compress(data, quality=11))
+
+
+def build(static_folder):
+    """Write hashed, minified and precompressed assets to static/dist.
+
+    Returns the manifest mapping logical paths (e.g. 'css/main.css') to
+    hashed paths relative to the static folder.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    sources = []
+    for directory in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(static_folder, directory)):
+            for name in files:
+                if name.endswith(HASHED_EXTENSIONS):
+                    path = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+                    sources.append(path)
+    # Stylesheets last, so the files they reference already have hashed names
+    sources.sort(key=lambda path: (path.endswith('.css'), path))
+
+    manifest = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as source:
+            data = minify(path, source.read())
+        if path.endswith('.css'):
+            data = _rewrite_css_urls(path, data.decode('utf-8'), manifest).encode('utf-8')
+        output_path = posixpath.join(DIST_DIR, hashed_name(path, data))
+        target = os.path.join(static_folder, output_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as output:
+            output.write(data)
+        if path.endswith(COMPRESSED_EXTENSIONS):
+            _write_compressed(target, data)
+        manifest[path] = output_path
+
+    # Replace the manifest in one step so running workers never read it half-written
+    manifest_path = os.path.join(dist, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+# Runtime
+def load_manifest(static_folder):
+    """Return static/dist/manifest.json, or an empty manifest before the first build.
+
+    The file is parsed once and re-read only when its mtime changes, so a
+    build-assets run during a deploy reaches running workers.
+    """
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    cached = _manifests.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _manifest_lock:
+        cached = _manifests.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, encoding='utf-8') as source:
+                    manifest = json.load(source)
+            except FileNotFoundError:
+                manifest = {}
+            cached = _manifests[path] = (mtime, manifest)
+    return cached[1]
+
+
+def asset_url(path):
+    """URL for a static asset: the hashed build if there is one, else the
+    plain file, else the CDN for vendored assets that were never fetched"""
+    manifest = load_manifest(current_app.static_folder)
+    if path in manifest:
+        return url_for('static', filename=manifest[path])
+    if path in VENDOR_ASSETS and not os.path.exists(os.path.join(current_app.static_folder, path)):
+        return VENDOR_ASSETS[path]
+    return url_for('static', filename=path)
+
+
+def send_static(filename):
+    """Static route that serves precompressed variants of built assets"""
+    static_folder = current_app.static_folder
+    if not filename.startswith(DIST_DIR + '/'):
+        return current_app.send_static_file(filename)
+
+    response = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in request.accept_encodings and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(static_folder, filename)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Register asset_url() for templates and the precompressed static route"""
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.view_functions['static'] = send_static
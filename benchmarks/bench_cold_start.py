@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark
+Starts fresh Python processes that build the app and request the dashboard
+once, and reports time-to-first-dashboard: from spawning the process to
+the first 200 response. Each run is repeated without a template bytecode
+cache, with an empty cache and with a cache filled by precompile(), so the
+effect of `flask precompile-templates` is visible. Results are saved as
+JSON; pass --baseline with an earlier result file to flag slower starts.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 10
+    python benchmarks/bench_cold_start.py --baseline benchmarks/results/cold_start-20240101T120000.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+MODES = ('no_cache', 'empty_cache', 'precompiled')
+
+
+def make_app(database_url, cache_dir):
+    from app import create_app
+    return create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'JINJA_BYTECODE_CACHE_DIR': cache_dir,
+        'SQL_PROFILER_PANEL': False,
+    })
+
+
+def child(database_url, cache_dir):
+    """Runs in the fresh process: build the app, render the dashboard once, print timings"""
+    started = time.perf_counter()
+    app = make_app(database_url, cache_dir)
+    created = time.perf_counter()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    response = client.get('/')
+    done = time.perf_counter()
+    print(json.dumps({'status': response.status_code, 'finished_at': time.time(),
+                      'create_app_ms': (created - started) * 1000, 'first_request_ms': (done - created) * 1000}))
+
+
+def prepare(database_url, users, costs, tours):
+    from extensions import db
+    from migrations import apply_migrations
+    from benchmarks.common import seed
+    import aggregates
+    from models import User, Cost, CostDailyTotal, TourProgram, UserSummary
+
+    app = make_app(database_url, '')
+    with app.app_context():
+        db.create_all()
+        apply_migrations(db.engine)
+        seed(db.engine, users, costs, tours)
+        with db.engine.begin() as connection:
+            aggregates.rebuild(connection, UserSummary.__table__, CostDailyTotal.__table__,
+                               User.__table__, Cost.__table__, TourProgram.__table__)
+
+
+def run_once(database_url, cache_dir):
+    spawned = time.time()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--database-url', database_url,
+                             '--cache-dir', cache_dir], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    if timings['status'] != 200:
+        raise RuntimeError(f"Dashboard returned {timings['status']}")
+    timings['total_ms'] = (timings['finished_at'] - spawned) * 1000
+    return timings
+
+
+def summarize(runs):
+    totals = [run['total_ms'] for run in runs]
+    return {
+        'runs': len(runs),
+        'median_ms': round(statistics.median(totals), 1),
+        'min_ms': round(min(totals), 1),
+        'max_ms': round(max(totals), 1),
+        'create_app_ms': round(statistics.median(run['create_app_ms'] for run in runs), 1),
+        'first_request_ms': round(statistics.median(run['first_request_ms'] for run in runs), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per mode')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--costs', type=int, default=1000)
+    parser.add_argument('--tours', type=int, default=100)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/cold_start-<time>.json)')
+    parser.add_argument('--baseline', help='Earlier result file to compare median time with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against the baseline')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--database-url', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', default='', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.database_url, args.cache_dir)
+        return
+
+    import templating
+    from benchmarks.common import save_results, compare_results
+
+    workdir = tempfile.mkdtemp()
+    database_url = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    cache_dir = os.path.join(workdir, 'jinja_cache')
+    prepare(database_url, args.users, args.costs, args.tours)
+
+    results = {}
+    for mode in MODES:
+        runs = []
+        for _ in range(args.runs):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            if mode == 'precompiled':
+                templating.precompile(make_app(database_url, cache_dir))
+            runs.append(run_once(database_url, '' if mode == 'no_cache' else cache_dir))
+        results[mode] = summarize(runs)
+
+    print(f"{'mode':<14}{'median ms':>11}{'min ms':>9}{'max ms':>9}{'create_app':>12}{'1st request':>13}")
+    for mode, row in results.items():
+        print(f"{mode:<14}{row['median_ms']:>11.1f}{row['min_ms']:>9.1f}{row['max_ms']:>9.1f}"
+              f"{row['create_app_ms']:>12.1f}{row['first_request_ms']:>13.1f}")
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key not in ('output', 'baseline', 'child', 'database_url', 'cache_dir')}
+    path = save_results('cold_start', parameters, results, args.output)
+    print(f'\nSaved {path}')
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.baseline:
+        sys.exit(1 if compare_results(args.baseline, results, 'median_ms', args.tolerance) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Listing latency benchmark for the per-user composite indexes
+Seeds a database without the indexes, times the listing queries,
+applies the migrations and times them again.
+
+Usage:
+    python benchmarks/bench_listing_indexes.py --costs 1000000
+    python benchmarks/bench_listing_indexes.py --database-url postgresql://... --costs 1000000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from sqlalchemy import create_engine, func, select, text
+
+from extensions import db
+from models import Cost, TourProgram
+from benchmarks.common import seed
+from migrations import MIGRATIONS, apply_migrations
+
+INDEX_NAMES = [
+    'ix_cost_user_id_date',
+    'ix_cost_created_at',
+    'ix_tour_program_user_id_start_date',
+    'ix_tour_program_created_at',
+]
+
+
+def listing_queries(user_id):
+    """The statements issued by costs(), tour_programs() and dashboard()"""
+    cost, tour = Cost.__table__, TourProgram.__table__
+    return {
+        'costs page 1': select(cost).where(cost.c.user_id == user_id)
+            .order_by(cost.c.date.desc()).limit(10),
+        'costs count': select(func.count()).select_from(cost).where(cost.c.user_id == user_id),
+        'tours page 1': select(tour).where(tour.c.user_id == user_id)
+            .order_by(tour.c.start_date.desc()).limit(10),
+        'dashboard recent costs': select(cost).order_by(cost.c.created_at.desc()).limit(5),
+        'dashboard recent tours': select(tour).order_by(tour.c.created_at.desc()).limit(5),
+    }
+
+
+def time_queries(engine, user_id, repeat):
+    results = {}
+    with engine.connect() as connection:
+        for label, query in listing_queries(user_id).items():
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(query).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Database to benchmark (default: temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--costs', type=int, default=1000000)
+    parser.add_argument('--tours', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(database_url)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for name in INDEX_NAMES:
+            connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        connection.execute(text('DROP TABLE IF EXISTS schema_version'))
+
+    print(f'Seeding {args.users} users, {args.costs} costs, {args.tours} tours into {engine.url.render_as_string()}')
+    started = time.perf_counter()
+    seed(engine, args.users, args.costs, args.tours)
+    print(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text('ANALYZE'))
+
+    before = time_queries(engine, 1, args.repeat)
+    started = time.perf_counter()
+    apply_migrations(engine)
+    print(f'Applied {len(MIGRATIONS)} migration(s) in {time.perf_counter() - started:.1f}s')
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text('ANALYZE'))
+    else:
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+    after = time_queries(engine, 1, args.repeat)
+
+    print(f"\n{'query':<26}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for label in before:
+        speedup = before[label] / after[label] if after[label] else float('inf')
+        print(f'{label:<26}{before[label]:>14.2f}{after[label]:>14.2f}{speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the request hot paths
+Times schema validation (per form and per row of a batch), get_translation
+and template rendering in isolation
+and saves the results as JSON; pass --baseline with an earlier result file
+to flag cases that got slower.
+
+Usage:
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --baseline benchmarks/results/micro-20240101T120000.json
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from flask import render_template
+from flask_login import login_user
+
+import views
+from app import create_app
+from extensions import db
+from models import CachedUser, Cost, TourProgram, User, CACHED_USER_FIELDS
+from pagination import keyset_paginate
+from validation import COST_SCHEMA, TOUR_SCHEMA
+from benchmarks.common import seed, save_results, compare_results
+
+
+COST_FORM = {'name': 'Hotel <b>"Grand"</b> & Spa', 'amount': '1234.56', 'date': '2024-05-17',
+             'category': 'Accommodation', 'description': 'Transfer from the airport ' * 9}
+TOUR_FORM = {'name': 'Istanbul City Tour', 'start_date': '2024-05-17', 'end_date': '2024-05-20',
+             'destination': 'Istanbul, Turkey', 'description': '3-day cultural tour'}
+INVALID_COST_FORM = {'name': '', 'amount': 'abc', 'date': '17/05/2024'}
+
+# Rows per batch case; their results also report the cost per row
+BATCH_ROWS = 1000
+
+
+def validation_cases():
+    batch = [dict(COST_FORM, amount=f'{i}.50', name=f'Cost {i}') for i in range(BATCH_ROWS)]
+    return {
+        'schema[cost]': lambda: COST_SCHEMA.validate(COST_FORM),
+        'schema[tour]': lambda: TOUR_SCHEMA.validate(TOUR_FORM),
+        'schema[cost_invalid]': lambda: COST_SCHEMA.validate(INVALID_COST_FORM),
+        f'schema_batch[cost x{BATCH_ROWS}]': lambda: list(COST_SCHEMA.validate_many(batch)),
+    }
+
+
+def translation_cases():
+    return {
+        'get_translation[en]': lambda: views.get_translation('dashboard', 'en'),
+        'get_translation[tr]': lambda: views.get_translation('dashboard', 'tr'),
+        'get_translation[missing]': lambda: views.get_translation('no_such_key', 'tr'),
+    }
+
+
+def template_cases(app):
+    """Render each template inside a request context, with a logged-in user where needed"""
+    with app.app_context():
+        db.create_all()
+        seed(db.engine, 1, 50, 20)
+        fields = {name: getattr(db.session.get(User, 1), name) for name in CACHED_USER_FIELDS}
+        costs = keyset_paginate(Cost.query.filter_by(user_id=1), (Cost.date, Cost.id), per_page=10, with_total=True)
+        tours = keyset_paginate(TourProgram.query.filter_by(user_id=1), (TourProgram.start_date, TourProgram.id),
+                                per_page=10, with_total=True)
+
+    def rendering(template, authenticated=True, **context):
+        def render():
+            with app.test_request_context('/'):
+                if authenticated:
+                    login_user(CachedUser(fields))
+                render_template(template, **context)
+        return render
+
+    return {
+        'render[auth/login.html]': rendering('auth/login.html', authenticated=False),
+        'render[costs/index.html]': rendering('costs/index.html', costs=costs),
+        'render[tour_programs/index.html]': rendering('tour_programs/index.html', tours=tours),
+        'render[settings/index.html]': rendering('settings/index.html'),
+    }
+
+
+def measure(function, repeat):
+    """Best time per call over ``repeat`` runs of an auto-sized loop"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {'us_per_op': round(best * 1e6, 3), 'ops_per_sec': round(1 / best, 1), 'loops': number}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this text')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/micro-<time>.json)')
+    parser.add_argument('--baseline', help='Earlier result file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    app = create_app('testing', {'SQL_PROFILER_PANEL': False})
+    cases = {**validation_cases(), **translation_cases(), **template_cases(app)}
+
+    results = {}
+    print(f"{'case':<44}{'us/op':>12}{'ops/s':>14}")
+    for name, function in cases.items():
+        if args.filter not in name:
+            continue
+        function()  # warm caches and compiled templates
+        results[name] = measure(function, args.repeat)
+        if name.startswith('schema_batch'):
+            results[name]['us_per_row'] = round(results[name]['us_per_op'] / BATCH_ROWS, 3)
+        per_row = results[name].get('us_per_row')
+        print(f"{name:<44}{results[name]['us_per_op']:>12.3f}{results[name]['ops_per_sec']:>14.1f}"
+              + (f"  ({per_row:.3f} us/row)" if per_row is not None else ''))
+
+    parameters = {'repeat': args.repeat, 'filter': args.filter}
+    path = save_results('micro', parameters, results, args.output)
+    print(f'\nSaved {path}')
+
+    if args.baseline:
+        sys.exit(1 if compare_results(args.baseline, results, 'us_per_op', args.tolerance) else 0)
+
+
+if __name__ == '__main__':
+    main()
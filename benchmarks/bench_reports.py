@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Reporting latency benchmark
+Seeds one user with a large cost history and times every report in
+reports.REPORTS, both uncached and served from the cache.
+
+Usage:
+    python benchmarks/bench_reports.py --costs 200000
+    python benchmarks/bench_reports.py --database-url postgresql://... --costs 200000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import aggregates
+import cache
+import reports
+from extensions import db
+from models import User, Cost, CostDailyTotal, TourProgram, UserSummary
+from benchmarks.common import seed
+from migrations import apply_migrations
+
+# Reports must come back within this budget for the target data size
+BUDGET_MS = 100
+
+
+def time_report(session, name, granularity, repeat, cached):
+    models = {'cost': Cost, 'daily': CostDailyTotal, 'tour': TourProgram, 'summary': UserSummary}
+    samples = []
+    for _ in range(repeat):
+        if not cached:
+            cache.get_cache().clear()
+        started = time.perf_counter()
+        reports.run_report(name, session, models, 1, granularity=granularity)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Database to benchmark (default: temporary SQLite file)')
+    parser.add_argument('--costs', type=int, default=200000)
+    parser.add_argument('--tours', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(database_url)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE IF EXISTS schema_version'))
+    apply_migrations(engine)
+
+    print(f'Seeding 1 user with {args.costs} costs and {args.tours} tours into {engine.url.render_as_string()}')
+    seed(engine, 1, args.costs, args.tours)
+    with engine.begin() as connection:
+        aggregates.rebuild(connection, UserSummary.__table__, CostDailyTotal.__table__,
+                           User.__table__, Cost.__table__, TourProgram.__table__)
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text('ANALYZE'))
+
+    print(f"\n{'report':<44}{'uncached (ms)':>15}{'cached (ms)':>13}")
+    failed = False
+    with Session(engine) as session:
+        for name in reports.REPORTS:
+            granularities = ['day', 'week', 'month', 'year'] if 'period' in name else ['month']
+            for granularity in granularities:
+                uncached = time_report(session, name, granularity, args.repeat, cached=False)
+                cached = time_report(session, name, granularity, args.repeat, cached=True)
+                label = f'{name} ({granularity})' if 'period' in name else name
+                flag = '' if uncached < BUDGET_MS else '  over budget'
+                failed = failed or bool(flag)
+                print(f'{label:<44}{uncached:>15.2f}{cached:>13.3f}{flag}')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
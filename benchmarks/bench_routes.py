@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Route load test
+Seeds synthetic users, costs and tours, then drives the core routes from
+concurrent clients in this process and reports p50/p95/p99 latency,
+throughput and SQL queries per route. Results are saved as JSON; pass
+--baseline with an earlier result file to flag routes that got slower.
+
+Usage:
+    python benchmarks/bench_routes.py --users 50 --costs 100000 --tours 5000 --concurrency 8
+    python benchmarks/bench_routes.py --database-url postgresql://... --duration 60
+    python benchmarks/bench_routes.py --baseline benchmarks/results/routes-20240101T120000.json
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from sqlalchemy import text, update
+from sqlalchemy.engine import make_url
+
+import aggregates
+import dbpool
+from app import create_app
+from extensions import db
+from models import User, Cost, CostDailyTotal, TourProgram, UserSummary
+from benchmarks.common import seed, save_results, compare_results
+from migrations import apply_migrations
+
+# name -> (method, path, request keyword arguments)
+ROUTES = {
+    'login': ('POST', '/login', {'data': {'username': 'admin', 'password': 'admin123'}}),
+    'dashboard': ('GET', '/', {}),
+    'costs': ('GET', '/costs', {}),
+    'tour_programs': ('GET', '/tour-programs', {}),
+    'add_cost': ('POST', '/costs/add', {'data': {'name': 'Load test', 'amount': '12.50', 'category': 'Other',
+                                                 'date': date.today().isoformat(), 'description': ''}}),
+    'change_language': ('POST', '/api/change-language', {'json': {'language': 'en'}}),
+}
+DEFAULT_MIX = 'dashboard=4,costs=4,tour_programs=3,add_cost=1,change_language=1,login=1'
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in ROUTES:
+            raise argparse.ArgumentTypeError(f'Unknown route: {name}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def make_app(database_url):
+    options = dbpool.sqlite_engine_options() if database_url.startswith('sqlite') else dbpool.engine_options(database_url)
+    return create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': options,
+        'SQL_PROFILER_HEADERS': True,
+        'SQL_PROFILER_PANEL': False,
+        'LOGIN_ATTEMPTS_PER_USER': 10 ** 9,
+        'LOGIN_ATTEMPTS_PER_IP': 10 ** 9,
+    })
+
+
+def prepare_database(app, users, costs, tours):
+    with app.app_context():
+        engine = db.engine
+        db.drop_all()
+        db.create_all()
+        with engine.begin() as connection:
+            connection.execute(text('DROP TABLE IF EXISTS schema_version'))
+        apply_migrations(engine)
+
+        print(f'Seeding {users} users, {costs} costs and {tours} tours into {engine.url.render_as_string()}')
+        seed(engine, users, costs, tours)
+        with engine.begin() as connection:
+            # The login route only accepts the admin account; give it the first user's data
+            connection.execute(update(User.__table__).where(User.__table__.c.id == 1).values(username='admin'))
+            aggregates.rebuild(connection, UserSummary.__table__, CostDailyTotal.__table__,
+                               User.__table__, Cost.__table__, TourProgram.__table__)
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(text('ANALYZE'))
+
+
+def worker(app, number, users, mix, deadline, remaining, samples, lock):
+    """Request a random route from ``mix`` until the deadline or the request budget runs out"""
+    rng = random.Random(number)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(number % users + 1)
+        session['_fresh'] = True
+    names, weights = list(mix), list(mix.values())
+    local = []
+    while time.perf_counter() < deadline:
+        with lock:
+            if remaining[0] <= 0:
+                break
+            remaining[0] -= 1
+        name = rng.choices(names, weights)[0]
+        method, path, kwargs = ROUTES[name]
+        # Logging in replaces the session user, so it gets a client of its own
+        target = app.test_client() if name == 'login' else client
+        started = time.perf_counter()
+        response = target.open(path, method=method, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+        local.append((name, elapsed, response.status_code, int(response.headers.get('X-Query-Count', 0))))
+        response.close()
+    with lock:
+        samples.extend(local)
+
+
+def percentile(values, q):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def summarize(samples, elapsed):
+    by_route = defaultdict(list)
+    for sample in samples:
+        by_route[sample[0]].append(sample)
+    results = {}
+    for name in sorted(by_route):
+        rows = by_route[name]
+        latencies = [row[1] for row in rows]
+        results[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row[2] >= 400),
+            'throughput_rps': round(len(rows) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'queries_avg': round(statistics.fmean(row[3] for row in rows), 2),
+            'queries_max': max(row[3] for row in rows),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Database to benchmark (default: temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--costs', type=int, default=50000)
+    parser.add_argument('--tours', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='Stop after this many requests (0: no limit)')
+    parser.add_argument('--warmup', type=int, default=50, help='Unrecorded requests before measuring')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help=f'Route weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/routes-<time>.json)')
+    parser.add_argument('--baseline', help='Earlier result file to compare p95 latency with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown against the baseline')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = make_app(database_url)
+    prepare_database(app, args.users, args.costs, args.tours)
+
+    lock = threading.Lock()
+    if args.warmup:
+        worker(app, 0, args.users, args.mix, time.perf_counter() + args.duration, [args.warmup], [], lock)
+
+    samples = []
+    remaining = [args.requests or float('inf')]
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=worker, args=(app, number, args.users, args.mix, deadline, remaining, samples, lock))
+               for number in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = summarize(samples, elapsed)
+    print(f'\n{len(samples)} requests from {args.concurrency} clients in {elapsed:.1f}s '
+          f'({len(samples) / elapsed:.1f} req/s)')
+    print(f"\n{'route':<18}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, row in results.items():
+        print(f"{name:<18}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['queries_avg']:>9.1f}")
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+    parameters['database'] = make_url(database_url).render_as_string(hide_password=True)
+    path = save_results('routes', parameters, results, args.output)
+    print(f'\nSaved {path}')
+
+    failed = any(row['errors'] for row in results.values())
+    if args.baseline:
+        failed = bool(compare_results(args.baseline, results, 'p95_ms', args.tolerance)) or failed
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import json
+import os
+import platform
+import subprocess
+from datetime import date, datetime, timezone
+
+import seeding
+import tourcosts
+from models import User, Cost, TourProgram
+
+
+def seed(engine, users, costs, tours, batch_size=seeding.DEFAULT_BATCH_SIZE):
+    """Load reproducible synthetic data the way ``init_db.py --costs ...`` does.
+
+    Tour totals are rolled up from the linked costs; the caller rebuilds
+    the dashboard and report aggregates when it needs them.
+    """
+    report = seeding.seed(engine, User.__table__, Cost.__table__, TourProgram.__table__,
+                          users=users, costs=costs, tours=tours, start=date(2015, 1, 1), days=3650,
+                          batch_size=batch_size, random_seed=42)
+    with engine.begin() as connection:
+        tourcosts.recompute(connection, TourProgram.__table__, Cost.__table__, report.tour_ids)
+    return report
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name, parameters, results, path=None):
+    """Write results as JSON, with the commit and interpreter they were measured on"""
+    now = datetime.now(timezone.utc)
+    document = {
+        'benchmark': name,
+        'created_at': now.isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': parameters,
+        'results': results,
+    }
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{now.strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(baseline_path, results, metric, tolerance):
+    """Print ``metric`` against a saved run; returns the names that got slower than ``tolerance``"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('commit') or 'unknown commit'}), {metric}:")
+    regressions = []
+    for name, values in results.items():
+        before = baseline['results'].get(name, {}).get(metric)
+        after = values.get(metric)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  regression'
+        print(f'{name:<44}{before:>12.3f}{after:>12.3f}{change:>+9.1%}{flag}')
+    return regressions
@@ -0,0 +1,134 @@
+"""
+Caching layer for Cost Calculation System
+Pluggable backends (in-process LRU with TTL, or a Redis-compatible server)
+for query results and rendered fragments. Keys include versions read from
+the database (a user's summary row, the exchange_rate and system_setting
+tables), so entries never need to be deleted explicitly and every worker
+and CLI process agrees on what is current.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Cache backend for a Redis-compatible server shared by all workers"""
+
+    def __init__(self, url, prefix='cost_calc', ttl=300):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package (pip install redis)')
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key, default=None):
+        data = self._client.get(self._key(key))
+        return default if data is None else pickle.loads(data)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                         ex=self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=f'{self.prefix}:*', count=500):
+            self._client.delete(key)
+
+
+_backend = TTLCache()
+
+
+def get_cache():
+    """The current app's cache backend, or the process default outside an app"""
+    if has_app_context():
+        return current_app.extensions.get('cache', _backend)
+    return _backend
+
+
+def set_cache(backend, app=None):
+    """Replace the backend of ``app``, or the process default when no app is given"""
+    global _backend
+    if app is not None:
+        app.extensions['cache'] = backend
+    else:
+        _backend = backend
+
+
+def init_app(app):
+    """Configure the cache backend from CACHE_* settings"""
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+    if backend == 'redis':
+        set_cache(RedisCache(app.config['CACHE_REDIS_URL'], prefix=app.config.get('CACHE_KEY_PREFIX', 'cost_calc'), ttl=ttl), app)
+    elif backend == 'memory':
+        set_cache(TTLCache(maxsize=app.config.get('CACHE_MAX_ENTRIES', 1024), ttl=ttl), app)
+    else:
+        raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+
+def make_key(*parts):
+    """Build a string cache key from its parts"""
+    return ':'.join('' if part is None else str(part) for part in parts)
+
+
+def cached(key, compute, ttl=None):
+    """Return the cached value for ``key``, computing and storing it on a miss"""
+    backend = get_cache()
+    value = backend.get(key)
+    if value is None:
+        value = compute()
+        backend.set(key, value, ttl)
+    return value
+
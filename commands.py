@@ -0,0 +1,145 @@
+"""
+CLI commands for Cost Calculation System
+Registered on the app by create_app(); run with ``flask --app app <command>``.
+"""
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+import aggregates
+import assets
+import currency
+import imports
+import templating
+import tourcosts
+from extensions import db
+from models import Cost, CostDailyTotal, ExchangeRate, TourProgram, User, UserSummary
+from validation import COST_SCHEMA
+
+
+@click.command('rebuild-aggregates')
+@with_appcontext
+def rebuild_aggregates_command():
+    """Recompute the dashboard aggregates from the cost and tour tables"""
+    # The rebuild stamps every summary row, which moves every user's data version
+    with db.engine.begin() as connection:
+        rows = aggregates.rebuild(connection, UserSummary.__table__, CostDailyTotal.__table__,
+                                  User.__table__, Cost.__table__, TourProgram.__table__)
+    print(f"Rebuilt aggregates for {rows} users")
+
+
+@click.command('recompute-tour-totals')
+@with_appcontext
+def recompute_tour_totals_command():
+    """Recompute every tour program's total_cost from its linked costs"""
+    with db.engine.begin() as connection:
+        tours = tourcosts.recompute(connection, TourProgram.__table__, Cost.__table__)
+        # Tour totals show on their owners' pages; move those users' data versions
+        aggregates.touch_all(connection, UserSummary.__table__, select(TourProgram.user_id).distinct())
+    print(f"Recomputed totals for {tours} tour programs")
+
+
+@click.command('set-exchange-rate')
+@click.argument('code')
+@click.argument('rate')
+@click.option('--date', 'effective_date', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='First day the rate applies to (default: today)')
+@with_appcontext
+def set_exchange_rate_command(code, rate, effective_date):
+    """Set how many base-currency units one unit of CODE is worth, and reprice its costs"""
+    code = code.upper()
+    if len(code) != 3 or not code.isalpha() or code == currency.BASE_CURRENCY:
+        raise click.UsageError(f'CODE must be a three-letter currency other than {currency.BASE_CURRENCY}')
+    try:
+        rate = Decimal(rate)
+    except InvalidOperation:
+        raise click.UsageError('RATE must be a number')
+    if not rate.is_finite() or rate <= 0:
+        raise click.UsageError('RATE must be a positive number')
+    effective_date = effective_date.date() if effective_date else date.today()
+
+    costs = Cost.__table__
+    with db.engine.begin() as connection:
+        repriced = currency.set_rate(connection, ExchangeRate.__table__, costs, code, effective_date, rate)
+        # Repriced costs change every stored total that includes them
+        if repriced:
+            aggregates.rebuild(connection, UserSummary.__table__, CostDailyTotal.__table__,
+                               User.__table__, costs, TourProgram.__table__)
+            tourcosts.recompute(connection, TourProgram.__table__, costs)
+    print(f"1 {code} = {rate} {currency.BASE_CURRENCY} from {effective_date.isoformat()}; repriced {repriced} costs")
+
+
+@click.command('build-assets')
+@click.option('--fetch', is_flag=True, help='Download vendored CDN assets missing from static/vendor')
+@with_appcontext
+def build_assets_command(fetch):
+    """Minify, fingerprint and precompress static assets into static/dist"""
+    static_folder = current_app.static_folder
+    if fetch:
+        for path in assets.fetch_vendor_assets(static_folder):
+            print(f"Fetched {path}")
+    manifest = assets.build(static_folder)
+    missing = [path for path in assets.VENDOR_ASSETS if path not in manifest]
+    if missing:
+        print(f"Not vendored (served from CDN): {', '.join(missing)}")
+    print(f"Built {len(manifest)} assets into static/{assets.DIST_DIR}")
+
+
+@click.command('precompile-templates')
+@click.option('--clear', is_flag=True, help='Empty the bytecode cache first')
+@with_appcontext
+def precompile_templates_command(clear):
+    """Compile every template into the Jinja bytecode cache"""
+    bytecode_cache = current_app.jinja_env.bytecode_cache
+    if bytecode_cache is None:
+        raise click.UsageError('JINJA_BYTECODE_CACHE_DIR is not set or not writable')
+    if clear:
+        bytecode_cache.clear()
+    compiled, failed = templating.precompile(current_app)
+    for name, error in failed:
+        click.echo(f"{name}: {error}", err=True)
+    print(f"Compiled {len(compiled)} templates into {templating.cache_directory(current_app)}")
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command('import-costs')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username that will own the imported costs')
+@click.option('--batch-size', default=imports.DEFAULT_BATCH_SIZE, show_default=True, help='Rows per insert transaction')
+@with_appcontext
+def import_costs_command(path, username, batch_size):
+    """Bulk import costs from a CSV, JSON or JSON Lines file"""
+    file_format = imports.detect_format(path)
+    if not file_format:
+        raise click.UsageError('File must have a .csv, .json or .jsonl extension')
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.UsageError(f'Unknown user: {username}')
+
+    with open(path, 'rb') as stream:
+        report = imports.import_costs(
+            db.engine, Cost.__table__, UserSummary.__table__, CostDailyTotal.__table__, COST_SCHEMA.validate,
+            user.id, imports.read_rows(stream, file_format), batch_size=batch_size,
+            rates=currency.get_rates(db.session, ExchangeRate.__table__)
+        )
+
+    for line, errors, row in report.rejected:
+        click.echo(f"Line {line}: {'; '.join(map(str, errors))}", err=True)
+    if report.error:
+        click.echo(f"Stopped after line {report.error[0]}: {report.error[1]}", err=True)
+    print(f"Imported {report.inserted} of {report.total} rows in {report.batches} batches ({len(report.rejected)} rejected)")
+
+
+COMMANDS = (rebuild_aggregates_command, recompute_tour_totals_command, set_exchange_rate_command,
+            build_assets_command, precompile_templates_command, import_costs_command)
+
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
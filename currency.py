@@ -0,0 +1,224 @@
+"""
+Currencies and exchange rates for Cost Calculation System
+Each cost keeps the amount and currency it was entered in, plus
+amount_base: the amount in BASE_CURRENCY at the rate effective on the
+cost's date. Every total (dashboard, reports, tour totals) sums amount_base
+and is converted to the user's display currency with a single factor per
+request. Rates are loaded from the exchange_rate table in one query and kept
+in memory until the table's version, read once per request, changes.
+"""
+
+import bisect
+from decimal import ROUND_HALF_UP, Decimal
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+
+from aggregates import keep_history
+
+# Currency of amount_base and of every stored total
+BASE_CURRENCY = 'USD'
+
+SYMBOLS = {'USD': '$', 'EUR': '€', 'GBP': '£', 'TRY': '₺'}
+
+CENT = Decimal('0.01')
+ONE = Decimal('1')
+
+
+class MissingRate(LookupError):
+    """No exchange rate is known for a currency"""
+
+
+class RateTable:
+    """In-memory copy of exchange_rate: units of BASE_CURRENCY per unit of each currency.
+
+    Each currency's rates are kept sorted by effective date, so the rate on a
+    given day is one bisect. Days before a currency's first rate use that
+    first rate. ``version`` is the table version the rows were read at.
+    """
+
+    def __init__(self, rows=(), version=None):
+        self.version = version
+        self._dates = {}
+        self._rates = {}
+        for code, effective_date, rate in sorted(rows, key=lambda row: (row[0], row[1])):
+            self._dates.setdefault(code, []).append(effective_date)
+            self._rates.setdefault(code, []).append(Decimal(str(rate)))
+
+    @property
+    def currencies(self):
+        return {BASE_CURRENCY, *self._dates}
+
+    def has(self, code):
+        return code == BASE_CURRENCY or code in self._dates
+
+    def rate(self, code, on=None):
+        """Rate effective on date ``on``; the latest rate when ``on`` is None"""
+        if code == BASE_CURRENCY:
+            return ONE
+        dates = self._dates.get(code)
+        if not dates:
+            raise MissingRate(code)
+        if on is None:
+            return self._rates[code][-1]
+        return self._rates[code][max(bisect.bisect_right(dates, on) - 1, 0)]
+
+    def converter(self):
+        """Return convert(amount, code, on) -> amount in BASE_CURRENCY.
+
+        Rates are looked up once per (currency, date) seen, so converting a
+        batch of rows costs one multiplication per row.
+        """
+        rates = {}
+
+        def convert(amount, code, on):
+            rate = rates.get((code, on))
+            if rate is None:
+                rate = rates[(code, on)] = self.rate(code, on)
+            return (Decimal(str(amount)) * rate).quantize(CENT, ROUND_HALF_UP)
+        return convert
+
+    def to_base(self, amount, code, on):
+        return self.converter()(amount, code, on)
+
+
+def rates_version(connection, rates):
+    """Version of the exchange_rate table: its row count and latest write.
+
+    Read from the table itself, so a rate set by any worker or CLI process
+    is seen by every other process on its next read.
+    """
+    return tuple(connection.execute(select(func.count(), func.max(rates.c.created_at))).one())
+
+
+_process_rates = {}
+
+
+def load_rates(connection, rates, version=None):
+    """Read the whole exchange_rate table into a RateTable"""
+    rows = connection.execute(select(rates.c.currency, rates.c.effective_date, rates.c.rate)).all()
+    return RateTable(rows, version)
+
+
+def get_rates(connection, rates):
+    """The app's RateTable, reloaded only when the table's version has changed.
+
+    ``connection`` is a Session or Connection; ``rates`` is the
+    exchange_rate Table. Within a request the version is read once.
+    """
+    if has_request_context() and 'exchange_rates' in g:
+        return g.exchange_rates
+    holder = current_app.extensions.setdefault('exchange_rates', {}) if has_app_context() else _process_rates
+    version = rates_version(connection, rates)
+    table = holder.get('rates')
+    if table is None or table.version != version:
+        table = holder['rates'] = load_rates(connection, rates, version)
+    if has_request_context():
+        g.exchange_rates = table
+    return table
+
+
+def rate_on(rates, code_column, date_column):
+    """Correlated subquery: the rate effective on a row's date, else the earliest one"""
+    effective = (select(rates.c.rate)
+                 .where(rates.c.currency == code_column, rates.c.effective_date <= date_column)
+                 .order_by(rates.c.effective_date.desc()).limit(1).scalar_subquery())
+    earliest = (select(rates.c.rate)
+                .where(rates.c.currency == code_column)
+                .order_by(rates.c.effective_date).limit(1).scalar_subquery())
+    return func.coalesce(effective, earliest)
+
+
+def reprice(connection, rates, costs, code=None):
+    """Recompute amount_base for non-base costs with one set-based UPDATE.
+
+    Limited to ``code`` when given, and always to currencies that have a
+    rate. Returns the number of costs updated.
+    """
+    statement = (update(costs)
+                 .values(amount_base=func.round(costs.c.amount * rate_on(rates, costs.c.currency, costs.c.date), 2))
+                 .where(costs.c.currency != BASE_CURRENCY,
+                        costs.c.currency.in_(select(rates.c.currency).distinct())))
+    if code is not None:
+        statement = statement.where(costs.c.currency == code)
+    return connection.execute(statement).rowcount
+
+
+def set_rate(connection, rates, costs, code, effective_date, rate):
+    """Store one rate and reprice the costs in that currency; returns the number repriced.
+
+    Stored totals are not touched: callers rebuild the aggregates and tour
+    totals when costs were repriced. The new row moves rates_version(), so
+    every process reloads its rates once the transaction commits.
+    """
+    if code == BASE_CURRENCY:
+        raise ValueError(f'{BASE_CURRENCY} is the base currency; its rate is always 1')
+    connection.execute(delete(rates).where(rates.c.currency == code, rates.c.effective_date == effective_date))
+    connection.execute(insert(rates).values(currency=code, effective_date=effective_date, rate=rate))
+    return reprice(connection, rates, costs, code)
+
+
+def register_listeners(cost_model, rate_model):
+    """Fill amount_base on ORM inserts and updates of costs.
+
+    Bulk Core inserts bypass these hooks and must supply amount_base
+    themselves, e.g. with RateTable.converter().
+    """
+    rates = rate_model.__table__
+
+    # Load the old values on assignment; the rollup listeners subtract the old amount_base
+    keep_history(cost_model.currency, cost_model.date)
+
+    def price(connection, target):
+        target.currency = target.currency or BASE_CURRENCY
+        target.amount_base = get_rates(connection, rates).to_base(target.amount, target.currency, target.date)
+
+    @event.listens_for(cost_model, 'before_insert')
+    def cost_inserting(mapper, connection, target):
+        price(connection, target)
+
+    @event.listens_for(cost_model, 'before_update')
+    def cost_updating(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in ('amount', 'currency', 'date')):
+            price(connection, target)
+
+
+# Display
+def supported_currencies():
+    return current_app.config.get('SUPPORTED_CURRENCIES') or [BASE_CURRENCY]
+
+
+def display_currency(default):
+    """The user's display currency, else ``default`` (the currency system setting)"""
+    return session.get('currency') or default
+
+
+def display_factor(rate_table, code):
+    """(currency, factor) turning BASE_CURRENCY totals into ``code`` at its latest rate.
+
+    Falls back to BASE_CURRENCY when ``code`` has no rate. Computed once
+    per request and currency.
+    """
+    factors = g.setdefault('display_factors', {}) if has_request_context() else {}
+    result = factors.get(code)
+    if result is None:
+        try:
+            result = (code, ONE / rate_table.rate(code))
+        except MissingRate:
+            result = (BASE_CURRENCY, ONE)
+        factors[code] = result
+    return result
+
+
+def display_rows(rows, rate_table, code, *fields):
+    """(currency, copy of ``rows``) with ``fields`` converted from BASE_CURRENCY, as rounded floats for JSON"""
+    code, factor = display_factor(rate_table, code)
+    factor = float(factor)
+    return code, [{**row, **{field: round(float(row[field] or 0) * factor, 2) for field in fields}} for row in rows]
+
+
+def format_money(amount, code):
+    text = f'{amount or 0:,.2f}'
+    symbol = SYMBOLS.get(code)
+    return f'{symbol}{text}' if symbol else f'{text} {code}'
@@ -0,0 +1,177 @@
+"""
+Database connection pool setup for Cost Calculation System
+Builds SQLAlchemy engine options (pool sizing, recycle, pre-ping and the
+PostgreSQL statement timeout) from environment variables, and meters pool
+checkouts so the pool can be sized to the number of workers. SQLite
+engines get WAL and tuned pragmas on every connection, and optionally a
+separate read-only pool.
+"""
+
+import os
+import threading
+import time
+
+from flask import g, has_request_context
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.pool import QueuePool
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def engine_options(uri, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800,
+                   statement_timeout_ms=30000):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``uri``.
+
+    The keyword arguments are per-config defaults; DB_POOL_SIZE,
+    DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING and
+    DB_STATEMENT_TIMEOUT_MS override them.
+    """
+    options = {'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'True').lower() == 'true'}
+    if uri.startswith('sqlite'):
+        # SQLite pools are chosen by Flask-SQLAlchemy and do not take sizing options
+        return options
+
+    options.update(
+        poolclass=MeteredQueuePool,
+        pool_size=_env_int('DB_POOL_SIZE', pool_size),
+        max_overflow=_env_int('DB_MAX_OVERFLOW', max_overflow),
+        pool_timeout=_env_int('DB_POOL_TIMEOUT', pool_timeout),
+        pool_recycle=_env_int('DB_POOL_RECYCLE', pool_recycle),
+    )
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', statement_timeout_ms)
+    if uri.startswith('postgresql') and statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+# SQLite performance profile; SQLITE_<NAME> environment variables override each pragma
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',        # readers no longer block on the writer
+    'synchronous': 'NORMAL',      # safe with WAL, fsync only at checkpoints
+    'busy_timeout': 5000,         # wait up to 5s for a lock instead of failing
+    'foreign_keys': 'ON',
+    'cache_size': -65536,         # 64MB page cache per connection
+    'mmap_size': 268435456,       # 256MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    """SQLITE_PRAGMAS with environment overrides applied"""
+    return {name: os.environ.get(f'SQLITE_{name.upper()}', value) for name, value in SQLITE_PRAGMAS.items()}
+
+
+def sqlite_engine_options(busy_timeout_ms=None):
+    """Engine options for a file-backed SQLite database shared by several threads"""
+    busy_timeout_ms = busy_timeout_ms or int(sqlite_pragmas()['busy_timeout'])
+    return {
+        'pool_pre_ping': False,
+        'connect_args': {'timeout': busy_timeout_ms / 1000, 'check_same_thread': False},
+    }
+
+
+def enable_sqlite_pragmas(engine, pragmas=None):
+    """Apply pragmas to every new DBAPI connection of a SQLite engine"""
+    pragmas = pragmas or sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def create_read_engine(engine, pool_size=5):
+    """Read-only QueuePool engine on the same SQLite file as ``engine``.
+
+    With WAL, reads on these connections run alongside the writer instead of
+    competing for the write engine's connections.
+    """
+    path = engine.url.database
+    read_engine = create_engine(f'sqlite:///file:{path}?mode=ro&uri=true', poolclass=MeteredQueuePool,
+                                pool_size=pool_size, max_overflow=pool_size,
+                                **sqlite_engine_options())
+    pragmas = {name: value for name, value in sqlite_pragmas().items() if name != 'journal_mode'}
+    pragmas['query_only'] = 'ON'
+    return enable_sqlite_pragmas(read_engine, pragmas)
+
+
+class PoolMetrics:
+    """Process-wide counters for connection checkouts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.waited = 0  # checkouts that found no idle connection
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.timeouts = 0
+            self.peak_checked_out = 0
+
+    def record_checkout(self, wait, checked_out, idle_before):
+        with self._lock:
+            self.checkouts += 1
+            if not idle_before:
+                self.waited += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkouts_without_idle_connection': self.waited,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'timeouts': self.timeouts,
+                'peak_checked_out': self.peak_checked_out,
+            }
+
+
+metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        idle_before = self.checkedin() > 0
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.record_timeout()
+            raise
+        wait = time.perf_counter() - started
+        metrics.record_checkout(wait, self.checkedout(), idle_before)
+        if has_request_context():
+            g.pool_wait = g.get('pool_wait', 0.0) + wait
+        return connection
+
+
+def pool_status(engine):
+    """Current pool gauges plus the checkout counters"""
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), idle=pool.checkedin(),
+                      overflow=pool.overflow(), timeout=pool.timeout())
+    status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,15 @@
+"""
+Flask extensions for Cost Calculation System
+Created unbound here and attached to an app by create_app(), so models,
+views and CLI tools can import them without building an app.
+"""
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from flask_wtf.csrf import CSRFProtect
+
+db = SQLAlchemy()
+csrf = CSRFProtect()
+login_manager = LoginManager()
+login_manager.login_view = 'login'
+login_manager.login_message = 'Please log in to access this page.'
@@ -0,0 +1,159 @@
+"""
+Bulk cost import for Cost Calculation System
+Validates CSV/JSON rows in a single streaming pass and inserts the valid
+ones in batches, each batch in its own transaction.
+"""
+
+import codecs
+import csv
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+import aggregates
+from currency import BASE_CURRENCY, MissingRate, RateTable
+from validation import FieldError
+
+DEFAULT_BATCH_SIZE = 1000
+IMPORT_FIELDS = ['name', 'amount', 'currency', 'date', 'category', 'description']
+
+# Raised while reading a file; UnicodeDecodeError and json.JSONDecodeError are ValueErrors
+READ_ERRORS = (ValueError, csv.Error)
+
+
+class ImportReport:
+    """Outcome of a bulk import"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = []  # (line number, [errors], raw row)
+        self.batches = 0
+        self.error = None  # (last line read, message) when the file could not be read to the end
+
+    @property
+    def total(self):
+        return self.inserted + len(self.rejected)
+
+    def reject(self, line, errors, row):
+        self.rejected.append((line, errors, row))
+
+
+def detect_format(filename):
+    """Return 'csv', 'json' or 'jsonl' for an uploaded file name, or None"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in ('csv', 'json', 'jsonl') else None
+
+
+def read_rows(stream, file_format):
+    """Yield (line number, row dict) pairs from a binary stream"""
+    if file_format == 'csv':
+        text = codecs.iterdecode(stream, 'utf-8-sig')
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(codecs.iterdecode(stream, 'utf-8-sig'), start=1):
+            if line.strip():
+                yield line_number, _json_row(line)
+    elif file_format == 'json':
+        # A JSON document has to be parsed whole; use JSON Lines for very large files
+        data = json.load(codecs.getreader('utf-8-sig')(stream))
+        for index, row in enumerate(data if isinstance(data, list) else [], start=1):
+            yield index, row if isinstance(row, dict) else {}
+    else:
+        raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def _readable(rows, report):
+    """Yield from ``rows`` until it ends or fails to read, recording the failure in ``report``"""
+    line = 0
+    iterator = iter(rows)
+    while True:
+        try:
+            line, row = next(iterator)
+        except StopIteration:
+            return
+        except READ_ERRORS as e:
+            report.error = (line, str(e))
+            return
+        yield line, row
+
+
+def _json_row(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return {}
+    return row if isinstance(row, dict) else {}
+
+
+def import_costs(engine, cost_table, summary_table, daily_table, validate, user_id, rows,
+                 batch_size=DEFAULT_BATCH_SIZE, rates=None):
+    """Validate and insert cost rows for one user.
+
+    ``validate`` is COST_SCHEMA.validate; rows that fail it are collected in
+    the report and do not abort the import. Rows without a currency are in
+    the base currency; other currencies are converted with ``rates`` (a
+    currency.RateTable) and rejected when it has no rate for them. Valid
+    rows are inserted with an executemany per batch, and the dashboard and
+    daily aggregates are updated in the same transaction as each batch.
+    A file that cannot be read to the end stops the import: the rows read
+    before the failure are still inserted and report.error says where.
+    """
+    report = ImportReport()
+    batch = []
+    to_base = (rates or RateTable()).converter()
+
+    def flush():
+        nonlocal batch
+        if not batch:
+            return
+        daily = defaultdict(lambda: [0, Decimal('0')])
+        for row in batch:
+            totals = daily[(row['date'], row['category'] or '')]
+            totals[0] += 1
+            totals[1] += row['amount_base']
+        with engine.begin() as connection:
+            connection.execute(insert(cost_table), batch)
+            aggregates.apply_delta(connection, summary_table, user_id, cost_count=len(batch),
+                                   cost_total=sum(total for _, total in daily.values()))
+            for (day, category), (count, total) in daily.items():
+                aggregates.apply_daily_delta(connection, daily_table, user_id, day, category,
+                                             cost_count=count, cost_total=total)
+        report.inserted += len(batch)
+        report.batches += 1
+        batch = []
+
+    for line, row in _readable(rows, report):
+        row = {key: row.get(key) for key in IMPORT_FIELDS}
+        errors, data = validate(row)
+        if errors:
+            report.reject(line, errors, row)
+            continue
+
+        code = data['currency'] or BASE_CURRENCY
+        try:
+            amount_base = to_base(data['amount'], code, data['date'])
+        except MissingRate:
+            report.reject(line, [FieldError('currency', 'no_rate', f'Currency: No exchange rate for {code}')], row)
+            continue
+
+        batch.append({
+            'name': data['name'],
+            'description': data['description'],
+            'amount': data['amount'],
+            'currency': code,
+            'amount_base': amount_base,
+            'category': data['category'],
+            'date': data['date'],
+            'user_id': user_id,
+            'created_at': datetime.now(timezone.utc),
+        })
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+    return report
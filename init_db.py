@@ -2,22 +2,42 @@
 """
 Database initialization script for Cost Calculation System
 Run this script to create the database and initial data
+
+Capacity tests can add synthetic data on top, e.g.:
+    python init_db.py --users 100 --costs 1000000 --tours 50000 --days 1825
 """
 
+import argparse
 import os
 import sys
 from datetime import datetime
-from app import app, db, User, Cost, TourProgram, SystemSetting
+from decimal import Decimal
+from app import create_app
+from extensions import db
+from models import User, Cost, TourProgram, SystemSetting, ExchangeRate, UserSummary, CostDailyTotal
+from migrations import apply_migrations
+import aggregates
+import tourcosts
+import search
+import seeding
 
-def create_database():
+def create_database(config_name=None):
     """Create database tables"""
     print("Creating database tables...")
     
+    app = create_app(config_name)
     with app.app_context():
         # Create all tables
         db.create_all()
         print("Database tables created successfully")
         
+        # Bring indexes and schema changes up to date on existing databases
+        applied = apply_migrations(db.engine)
+        if applied:
+            print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+        else:
+            print("Database schema is up to date")
+        
         # Create test user if not exists
         test_user = User.query.filter_by(username='admin').first()
         if not test_user:
@@ -36,6 +56,15 @@ def create_database():
         else:
             print("Test user already exists")
         
+        # Sample exchange rates in base-currency units; replace them with `flask set-exchange-rate`
+        if ExchangeRate.query.count() == 0:
+            for code, rate in (('EUR', '1.08'), ('TRY', '0.031')):
+                db.session.add(ExchangeRate(currency=code, effective_date=datetime.now().date(), rate=Decimal(rate)))
+            db.session.commit()
+            print("Sample exchange rates created")
+        else:
+            print("Exchange rates already exist")
+        
         # Create sample costs if none exist
         if Cost.query.count() == 0:
             sample_costs = [
@@ -82,7 +111,6 @@ def create_database():
                     start_date=datetime.now().date(),
                     end_date=datetime.now().date(),
                     destination='Istanbul, Turkey',
-                    total_cost=1450.00,
                     user_id=test_user.id
                 ),
                 TourProgram(
@@ -91,7 +119,6 @@ def create_database():
                     start_date=datetime.now().date(),
                     end_date=datetime.now().date(),
                     destination='Cappadocia, Turkey',
-                    total_cost=750.00,
                     user_id=test_user.id
                 )
             ]
@@ -99,6 +126,11 @@ def create_database():
             for tour in sample_tours:
                 db.session.add(tour)
             
+            # Tour totals are rolled up from linked costs; the sample costs make up the Istanbul tour
+            for cost in Cost.query.filter(Cost.user_id == test_user.id, Cost.tour_program_id.is_(None),
+                                          Cost.name.in_(['Hotel Accommodation', 'Flight Tickets', 'Meals'])):
+                cost.tour_program = sample_tours[0]
+            
             db.session.commit()
             print("Sample tour program data created")
         else:
@@ -140,10 +172,57 @@ def create_database():
         print("\nDatabase initialization completed successfully!")
         print("\nYou can now run the application with: python app.py")
         print("Login credentials: admin / admin123")
+    return app
+
+def seed_database(app, args):
+    """Bulk load synthetic users, costs and tours, then rebuild the aggregates"""
+    print(f"\nSeeding {args.users} users, {args.costs} costs and {args.tours} tours...")
+    
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        # The search index is rebuilt once after the load instead of row by row
+        with search.deferred_index(db.engine):
+            report = seeding.seed(
+                db.engine, User.__table__, Cost.__table__, TourProgram.__table__,
+                owner_ids=[admin.id] if admin else [], users=args.users, costs=args.costs, tours=args.tours,
+                start=datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else None, days=args.days,
+                categories=args.categories, destinations=args.destinations, tour_share=args.tour_share,
+                batch_size=args.batch_size, random_seed=args.random_seed
+            )
+        print(f"Loaded {report.rows} rows in {report.seconds:.1f}s ({report.rows_per_minute:,} rows/minute)")
+        
+        # Dashboard, daily report and tour totals are derived; rebuild them in one pass.
+        # The rebuild stamps every summary row, which moves every user's data version
+        with db.engine.begin() as connection:
+            aggregates.rebuild(connection, UserSummary.__table__, CostDailyTotal.__table__,
+                               User.__table__, Cost.__table__, TourProgram.__table__)
+            tourcosts.recompute(connection, TourProgram.__table__, Cost.__table__, report.tour_ids)
+        print("Aggregates rebuilt")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', help='Configuration name (default: FLASK_ENV, then development)')
+    parser.add_argument('--users', type=int, default=0, help='Synthetic users to create')
+    parser.add_argument('--costs', type=int, default=0, help='Synthetic costs to create')
+    parser.add_argument('--tours', type=int, default=0, help='Synthetic tour programs to create')
+    parser.add_argument('--start', help='First date of the generated data, YYYY-MM-DD (default: DAYS before today)')
+    parser.add_argument('--days', type=int, default=365, help='Number of days the data is spread over')
+    parser.add_argument('--categories', type=seeding.parse_distribution,
+                        default=seeding.DEFAULT_CATEGORIES, help="Cost category weights, e.g. 'Travel=30,Food=20'")
+    parser.add_argument('--destinations', type=seeding.parse_distribution,
+                        default=seeding.DEFAULT_DESTINATIONS, help="Tour destination weights, e.g. 'Istanbul=3,Izmir=1'")
+    parser.add_argument('--tour-share', type=float, default=seeding.DEFAULT_TOUR_SHARE,
+                        help='Share of costs linked to a generated tour (0-1)')
+    parser.add_argument('--batch-size', type=int, default=seeding.DEFAULT_BATCH_SIZE, help='Rows per insert transaction')
+    parser.add_argument('--random-seed', type=int, help='Seed for reproducible data')
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
+    args = parse_args()
     try:
-        create_database()
+        app = create_database(args.config)
+        if args.users or args.costs or args.tours:
+            seed_database(app, args)
     except Exception as e:
         print(f"Error initializing database: {e}")
         sys.exit(1)
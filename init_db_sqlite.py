@@ -7,17 +7,29 @@ Run this script to create the database and initial data
 import os
 import sys
 from datetime import datetime
-from app import app, db, User, Cost, TourProgram, SystemSetting
+from decimal import Decimal
+from app import create_app
+from extensions import db
+from models import User, Cost, TourProgram, SystemSetting, ExchangeRate
+from migrations import apply_migrations
 
 def create_database():
     """Create database tables"""
     print("Creating database tables...")
     
+    app = create_app('sqlite')
     with app.app_context():
         # Create all tables
         db.create_all()
         print("✓ Database tables created successfully")
         
+        # Bring indexes and schema changes up to date on existing databases
+        applied = apply_migrations(db.engine)
+        if applied:
+            print(f"✓ Applied migrations: {', '.join(str(v) for v in applied)}")
+        else:
+            print("✓ Database schema is up to date")
+        
         # Create test user if not exists
         test_user = User.query.filter_by(username='admin').first()
         if not test_user:
@@ -36,6 +48,15 @@ def create_database():
         else:
             print("✓ Test user already exists")
         
+        # Sample exchange rates in base-currency units; replace them with `flask set-exchange-rate`
+        if ExchangeRate.query.count() == 0:
+            for code, rate in (('EUR', '1.08'), ('TRY', '0.031')):
+                db.session.add(ExchangeRate(currency=code, effective_date=datetime.now().date(), rate=Decimal(rate)))
+            db.session.commit()
+            print("✓ Sample exchange rates created")
+        else:
+            print("✓ Exchange rates already exist")
+        
         # Create sample costs if none exist
         if Cost.query.count() == 0:
             sample_costs = [
@@ -82,7 +103,6 @@ def create_database():
                     start_date=datetime.now().date(),
                     end_date=datetime.now().date(),
                     destination='Istanbul, Turkey',
-                    total_cost=1450.00,
                     user_id=test_user.id
                 ),
                 TourProgram(
@@ -91,7 +111,6 @@ def create_database():
                     start_date=datetime.now().date(),
                     end_date=datetime.now().date(),
                     destination='Cappadocia, Turkey',
-                    total_cost=750.00,
                     user_id=test_user.id
                 )
             ]
@@ -99,6 +118,11 @@ def create_database():
             for tour in sample_tours:
                 db.session.add(tour)
             
+            # Tour totals are rolled up from linked costs; the sample costs make up the Istanbul tour
+            for cost in Cost.query.filter(Cost.user_id == test_user.id, Cost.tour_program_id.is_(None),
+                                          Cost.name.in_(['Hotel Accommodation', 'Flight Tickets', 'Meals'])):
+                cost.tour_program = sample_tours[0]
+            
             db.session.commit()
             print("✓ Sample tour program data created")
         else:
@@ -138,7 +162,7 @@ def create_database():
             print("✓ System settings already exist")
         
         print("\nDatabase initialization completed successfully!")
-        print("\nYou can now run the application with: python app.py")
+        print("\nYou can now run the application with: python app_sqlite.py")
         print("Login credentials: admin / admin123")
 
 if __name__ == '__main__':
@@ -0,0 +1,160 @@
+"""
+Logging setup for Cost Calculation System
+Records are handed to a queue on the request thread and written as JSON
+lines by a background QueueListener, so log I/O never delays a response.
+Every request also produces one structured timing record (route, status,
+DB time, template render time, total latency), sampled per endpoint.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import before_render_template, g, request, template_rendered
+from flask.logging import default_handler
+
+import profiler
+
+# LogRecord attributes that are not user-supplied extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of request records for noisy endpoints.
+
+    ``rates`` maps endpoint names to the fraction kept; errors are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'endpoint', None))
+        if rate is None or record.levelno >= logging.WARNING or getattr(record, 'status', 0) >= 500:
+            return True
+        return random.random() < rate
+
+
+def parse_sample_rates(value):
+    """Parse 'static=0.01,report_data=0.1' into a dict"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        endpoint, _, rate = item.partition('=')
+        rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+# Per-request render timing; DB time comes from the query profiler
+def _start_render_timer(sender, template, context, **extra):
+    if 'request_started' in g:
+        g.render_stack.append(time.perf_counter())
+
+
+def _stop_render_timer(sender, template, context, **extra):
+    if 'request_started' in g and g.render_stack:
+        started = g.render_stack.pop()
+        # Nested renders are already inside the outer render's time
+        if not g.render_stack:
+            g.render_time += time.perf_counter() - started
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.render_time = 0.0
+    g.render_stack = []
+
+
+def _log_request(logger):
+    def log_request(response):
+        if 'request_started' not in g:
+            return response
+        status = response.status_code
+        profile = profiler.current_profile()
+        logger.log(
+            logging.ERROR if status >= 500 else logging.INFO,
+            '%s %s %s', request.method, request.path, status,
+            extra={
+                'method': request.method,
+                'route': request.url_rule.rule if request.url_rule else None,
+                'endpoint': request.endpoint,
+                'status': status,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+                'db_ms': round(profile.total * 1000, 2),
+                'db_queries': profile.count,
+                'render_ms': round(g.render_time * 1000, 2),
+                'pool_wait_ms': round(g.get('pool_wait', 0.0) * 1000, 2),
+                'user_id': g.get('_login_user').get_id() if g.get('_login_user') else None,
+            },
+        )
+        return response
+    return log_request
+
+
+def init_app(app):
+    """Route app logs through a queue to a JSON file and log request timings"""
+    request_logger = app.logger.getChild('request')
+    # Loggers are shared by every app with the same name; replace, don't stack
+    for old_filter in [f for f in request_logger.filters if isinstance(f, SamplingFilter)]:
+        request_logger.removeFilter(old_filter)
+    request_logger.addFilter(SamplingFilter(parse_sample_rates(app.config.get('LOG_SAMPLE_RATES'))))
+    app.before_request(_start_request)
+    app.after_request(_log_request(request_logger))
+    before_render_template.connect(_start_render_timer, app)
+    template_rendered.connect(_stop_render_timer, app)
+
+    if app.debug or app.testing:
+        return
+
+    for old_handler in [h for h in app.logger.handlers if isinstance(h, QueueHandler)]:
+        app.logger.removeHandler(old_handler)
+        old_listener = getattr(old_handler, 'listener', None)
+        if old_listener is not None:
+            atexit.unregister(old_listener.stop)
+            old_listener.stop()
+
+    log_dir = app.config.get('LOG_DIR', 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = RotatingFileHandler(os.path.join(log_dir, 'cost_calculation.log'),
+                                       maxBytes=app.config.get('LOG_MAX_BYTES', 10485760),
+                                       backupCount=app.config.get('LOG_BACKUP_COUNT', 10))
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    app.extensions['log_listener'] = listener
+
+    # Flask's default handler writes to stderr on the request thread; the listener does that now
+    app.logger.removeHandler(default_handler)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.listener = listener
+    app.logger.addHandler(queue_handler)
+    app.logger.setLevel(logging.INFO)
@@ -0,0 +1,148 @@
+"""
+Schema migrations for Cost Calculation System
+Brings existing databases up to date with the current models
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+
+import search
+from currency import BASE_CURRENCY
+
+def _link_costs_to_tours(connection):
+    statements = []
+    if 'tour_program_id' not in {column['name'] for column in inspect(connection).get_columns('cost')}:
+        statements.append('ALTER TABLE cost ADD COLUMN tour_program_id INTEGER '
+                          'REFERENCES tour_program (id) ON DELETE SET NULL')
+    if connection.dialect.name == 'postgresql':
+        statements.append('ALTER TABLE tour_program ALTER COLUMN total_cost TYPE NUMERIC(14, 2)')
+    return statements + [
+        'CREATE INDEX IF NOT EXISTS ix_cost_tour_program_id_category ON cost (tour_program_id, category, amount)',
+        # total_cost becomes the rollup of linked costs; tours without any keep their hand-entered total
+        'UPDATE tour_program SET total_cost = '
+        '(SELECT SUM(amount) FROM cost WHERE cost.tour_program_id = tour_program.id) '
+        'WHERE EXISTS (SELECT 1 FROM cost WHERE cost.tour_program_id = tour_program.id)',
+    ]
+
+
+def _add_tour_opening_total(connection):
+    if 'opening_total' in {column['name'] for column in inspect(connection).get_columns('tour_program')}:
+        return []
+    return [
+        'ALTER TABLE tour_program ADD COLUMN opening_total NUMERIC(14, 2) NOT NULL DEFAULT 0',
+        # Whatever total_cost holds beyond its linked costs was entered by hand; keep it as the opening balance
+        'UPDATE tour_program SET opening_total = COALESCE(total_cost, 0) - COALESCE('
+        '(SELECT SUM(amount_base) FROM cost WHERE cost.tour_program_id = tour_program.id), 0)',
+    ]
+
+
+def _add_cost_currency(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('cost')}
+    statements = []
+    # Costs entered before currencies existed were in the base currency
+    if 'currency' not in columns:
+        statements.append(f"ALTER TABLE cost ADD COLUMN currency VARCHAR(3) NOT NULL DEFAULT '{BASE_CURRENCY}'")
+    if 'amount_base' not in columns:
+        statements.append('ALTER TABLE cost ADD COLUMN amount_base NUMERIC(14, 2)')
+    statements += [
+        'CREATE TABLE IF NOT EXISTS exchange_rate ('
+        'currency VARCHAR(3) NOT NULL, '
+        'effective_date DATE NOT NULL, '
+        'rate NUMERIC(18, 8) NOT NULL, '
+        'created_at TIMESTAMP, '
+        'PRIMARY KEY (currency, effective_date))',
+        'UPDATE cost SET amount_base = amount WHERE amount_base IS NULL',
+        # Tour totals and breakdowns now sum amount_base
+        'DROP INDEX IF EXISTS ix_cost_tour_program_id_category',
+        'CREATE INDEX ix_cost_tour_program_id_category ON cost (tour_program_id, category, amount_base)',
+    ]
+    if connection.dialect.name == 'postgresql':
+        statements.append('ALTER TABLE cost ALTER COLUMN amount_base SET NOT NULL')
+    return statements
+
+
+# Each migration is (version, description, list of SQL statements), or a
+# callable taking the connection and returning the list when the statements
+# depend on the current schema.
+# Statements must be idempotent so a fresh database created by
+# db.create_all() can be stamped without errors.
+MIGRATIONS = [
+    (1, 'Composite indexes for per-user listings and dashboard ordering', [
+        'CREATE INDEX IF NOT EXISTS ix_cost_user_id_date ON cost (user_id, date)',
+        'CREATE INDEX IF NOT EXISTS ix_cost_created_at ON cost (created_at)',
+        'CREATE INDEX IF NOT EXISTS ix_tour_program_user_id_start_date ON tour_program (user_id, start_date)',
+        'CREATE INDEX IF NOT EXISTS ix_tour_program_created_at ON tour_program (created_at)',
+    ]),
+    (2, 'Per-user dashboard aggregates table with backfill', [
+        'CREATE TABLE IF NOT EXISTS user_summary ('
+        'user_id INTEGER NOT NULL PRIMARY KEY REFERENCES "user" (id), '
+        'cost_count INTEGER NOT NULL DEFAULT 0, '
+        'cost_total NUMERIC(14, 2) NOT NULL DEFAULT 0, '
+        'tour_count INTEGER NOT NULL DEFAULT 0, '
+        'updated_at TIMESTAMP)',
+        'DELETE FROM user_summary',
+        'INSERT INTO user_summary (user_id, cost_count, cost_total, tour_count, updated_at) '
+        'SELECT u.id, COALESCE(c.cost_count, 0), COALESCE(c.cost_total, 0), COALESCE(t.tour_count, 0), CURRENT_TIMESTAMP '
+        'FROM "user" u '
+        'LEFT JOIN (SELECT user_id, COUNT(*) AS cost_count, SUM(amount) AS cost_total FROM cost GROUP BY user_id) c '
+        'ON c.user_id = u.id '
+        'LEFT JOIN (SELECT user_id, COUNT(*) AS tour_count FROM tour_program GROUP BY user_id) t '
+        'ON t.user_id = u.id',
+    ]),
+    (3, 'Per-day cost totals by category for reports, with backfill', [
+        'CREATE TABLE IF NOT EXISTS cost_daily_total ('
+        'user_id INTEGER NOT NULL REFERENCES "user" (id), '
+        'day DATE NOT NULL, '
+        "category VARCHAR(100) NOT NULL DEFAULT '', "
+        'cost_count INTEGER NOT NULL DEFAULT 0, '
+        'cost_total NUMERIC(14, 2) NOT NULL DEFAULT 0, '
+        'updated_at TIMESTAMP, '
+        'PRIMARY KEY (user_id, day, category))',
+        'DELETE FROM cost_daily_total',
+        'INSERT INTO cost_daily_total (user_id, day, category, cost_count, cost_total, updated_at) '
+        "SELECT user_id, date, COALESCE(category, ''), COUNT(*), SUM(amount), CURRENT_TIMESTAMP "
+        "FROM cost GROUP BY user_id, date, COALESCE(category, '')",
+    ]),
+    (4, 'Link costs to tour programs and roll their amounts into total_cost', _link_costs_to_tours),
+    (5, 'Full-text search indexes over cost and tour program text',
+     lambda connection: search.index_statements(connection.dialect.name)),
+    (6, 'Cost currencies, exchange rates and base-currency amounts', _add_cost_currency),
+    (7, 'Keep hand-entered tour totals as an opening balance under the linked costs', _add_tour_opening_total),
+]
+
+
+def _ensure_version_table(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200), '
+        'applied_at TIMESTAMP)'
+    ))
+
+
+def current_version(connection):
+    """Return the highest migration version applied to the database"""
+    _ensure_version_table(connection)
+    return connection.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+
+def apply_migrations(engine, target=None):
+    """Apply pending migrations in order, each in its own transaction"""
+    applied = []
+    with engine.begin() as connection:
+        version = current_version(connection)
+
+    for migration_version, description, statements in MIGRATIONS:
+        if migration_version <= version or (target is not None and migration_version > target):
+            continue
+        with engine.begin() as connection:
+            statements = statements(connection) if callable(statements) else statements
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text('INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': migration_version, 'd': description, 't': datetime.now(timezone.utc)}
+            )
+        applied.append(migration_version)
+    return applied
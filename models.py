@@ -0,0 +1,160 @@
+"""
+Database models for Cost Calculation System
+Shared by every entry point; the database backend comes from the config
+passed to create_app().
+"""
+
+from datetime import datetime, timezone
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+import aggregates
+import cache
+import currency
+import tourcosts
+from currency import BASE_CURRENCY
+from extensions import db
+
+# User model
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    first_name = db.Column(db.String(50), nullable=False)
+    last_name = db.Column(db.String(50), nullable=False)
+    department = db.Column(db.String(100))
+    position = db.Column(db.String(100))
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_login = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+# Cost model
+class Cost(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default=BASE_CURRENCY, server_default=BASE_CURRENCY)
+    # amount in BASE_CURRENCY at the rate effective on ``date``; every total sums this
+    amount_base = db.Column(db.Numeric(14, 2), nullable=False)
+    category = db.Column(db.String(100))
+    date = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tour_program_id = db.Column(db.Integer, db.ForeignKey('tour_program.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    user = db.relationship('User', backref=db.backref('costs', lazy=True))
+    tour_program = db.relationship('TourProgram', backref=db.backref('costs', lazy='dynamic'))
+
+    __table_args__ = (
+        db.Index('ix_cost_user_id_date', 'user_id', 'date'),
+        db.Index('ix_cost_created_at', 'created_at'),
+        # Covers the per-tour breakdown and total_cost recompute without touching the table
+        db.Index('ix_cost_tour_program_id_category', 'tour_program_id', 'category', 'amount_base'),
+    )
+
+# Tour Program model
+class TourProgram(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    destination = db.Column(db.String(200))
+    # opening_total plus the sum of the linked costs, maintained by the tourcosts listeners
+    total_cost = db.Column(db.Numeric(14, 2), default=0)
+    # Total entered by hand before costs could be linked to tours
+    opening_total = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    user = db.relationship('User', backref=db.backref('tour_programs', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_tour_program_user_id_start_date', 'user_id', 'start_date'),
+        db.Index('ix_tour_program_created_at', 'created_at'),
+    )
+
+# System Settings model
+class SystemSetting(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    value = db.Column(db.Text)
+    description = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+# Exchange rates by effective date, maintained with currency.set_rate()
+class ExchangeRate(db.Model):
+    __tablename__ = 'exchange_rate'
+    currency = db.Column(db.String(3), primary_key=True)
+    effective_date = db.Column(db.Date, primary_key=True)
+    # Units of BASE_CURRENCY per unit of ``currency``
+    rate = db.Column(db.Numeric(18, 8), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+# Per-user dashboard totals, maintained by the aggregates listeners
+class UserSummary(db.Model):
+    __tablename__ = 'user_summary'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    cost_count = db.Column(db.Integer, nullable=False, default=0)
+    cost_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    tour_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+# Per-day cost totals by category, the source for period reports
+class CostDailyTotal(db.Model):
+    __tablename__ = 'cost_daily_total'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True, default='')
+    cost_count = db.Column(db.Integer, nullable=False, default=0)
+    cost_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+currency.register_listeners(Cost, ExchangeRate)
+aggregates.register_listeners(UserSummary, CostDailyTotal, Cost, TourProgram)
+tourcosts.register_listeners(Cost, TourProgram)
+
+# Identity cache: load_user() serves a slim, cached copy of the user row
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'department',
+                      'position', 'is_active', 'created_at', 'last_login')
+
+class CachedUser(UserMixin):
+    """Read-only projection of User used as current_user"""
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+    # UserMixin.is_active is a class property, which would hide the cached field
+    @property
+    def is_active(self):
+        return bool(self.__dict__.get('is_active', True))
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+def user_cache_key(user_id):
+    return cache.make_key('user', user_id)
+
+# Cached users are dropped after commit, so a concurrent load_user() cannot re-cache the old row
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def collect_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_cached_user_ids', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_cached_users(session):
+    for user_id in session.info.pop('changed_cached_user_ids', ()):
+        cache.get_cache().delete(user_cache_key(user_id))
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_changed_users(session):
+    session.info.pop('changed_cached_user_ids', None)
@@ -0,0 +1,151 @@
+"""
+Keyset (seek) pagination for Cost Calculation System
+Pages are addressed by opaque cursors instead of page numbers, so deep
+pages cost the same as the first one and no COUNT(*) is needed.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import func, literal, select, tuple_
+
+# Upper bound for the optional approximate total
+TOTAL_LIMIT = 1000
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def encode_cursor(values, direction):
+    """Build an opaque cursor token from the sort key of a row"""
+    payload = json.dumps([direction, [_encode_value(v) for v in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _matches(value, column):
+    """Whether a decoded cursor value has the Python type of its sort column"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value is not None
+    if python_type is date:
+        # datetime is a date subclass; only a plain date compares with a DATE column
+        return type(value) is date
+    if python_type is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, python_type)
+
+
+def decode_cursor(token, sort_columns=None):
+    """Return (direction, values) for a cursor token, or None if it is invalid.
+
+    With ``sort_columns``, a token whose values do not match them in number
+    and type (e.g. a hand-edited one) is invalid too.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if direction not in ('next', 'prev') or not isinstance(values, list):
+            return None
+        values = [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        return None
+    if sort_columns is not None and (len(values) != len(sort_columns) or
+                                     not all(map(_matches, values, sort_columns))):
+        return None
+    return direction, values
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, sort_columns, cursor=None, per_page=10, with_total=False):
+    """Paginate a query in descending order of ``sort_columns``.
+
+    ``sort_columns`` must identify a row uniquely, e.g. ``(Cost.date, Cost.id)``.
+    The query should not already be ordered.
+    """
+    # An invalid or tampered cursor falls back to the first page
+    decoded = decode_cursor(cursor, sort_columns)
+    direction, values = decoded if decoded else ('next', None)
+    key = tuple_(*sort_columns)
+
+    page_query = query
+    if values is not None:
+        page_query = page_query.filter(key < tuple_(*values) if direction == 'next' else key > tuple_(*values))
+
+    if direction == 'next':
+        page_query = page_query.order_by(*[column.desc() for column in sort_columns])
+    else:
+        page_query = page_query.order_by(*[column.asc() for column in sort_columns])
+
+    # Fetch one extra row to learn whether another page exists in this direction
+    rows = page_query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    def row_key(row):
+        return [getattr(row, column.key) for column in sort_columns]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == 'next':
+            if has_more:
+                next_cursor = encode_cursor(row_key(rows[-1]), 'next')
+            if values is not None:
+                prev_cursor = encode_cursor(row_key(rows[0]), 'prev')
+        else:
+            next_cursor = encode_cursor(row_key(rows[-1]), 'next')
+            if has_more:
+                prev_cursor = encode_cursor(row_key(rows[0]), 'prev')
+
+    total = None
+    total_is_estimate = False
+    if with_total:
+        total = approximate_count(query)
+        total_is_estimate = total >= TOTAL_LIMIT
+
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor, total, total_is_estimate)
+
+
+def approximate_count(query, limit=TOTAL_LIMIT):
+    """Count rows of a query, stopping at ``limit`` so large listings stay cheap"""
+    capped = query.with_entities(literal(1)).limit(limit).subquery()
+    return query.session.execute(select(func.count()).select_from(capped)).scalar()
+
@@ -0,0 +1,141 @@
+"""
+SQL query profiler for Cost Calculation System
+Times every statement through SQLAlchemy cursor events and keeps a
+per-request profile: query count, total DB time, per-statement totals and
+repeated statements that point at N+1 loading. The profile is exposed as a
+Server-Timing header and a debug panel that shows only the request's own
+statements; statements slower than the configured threshold also go to the
+slow-query log.
+"""
+
+import logging
+import re
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, g, has_app_context, has_request_context, render_template, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Used outside an app context; init_app() keeps each app's own copy, built
+# from its SQL_PROFILER_* settings, in app.extensions['profiler']
+DEFAULT_SETTINGS = {
+    'slow_query_ms': 200,
+    'n_plus_one_threshold': 5,
+    'headers': False,
+    'panel': False,
+    'logger': logging.getLogger(__name__),
+}
+
+class QueryProfile:
+    """Statements executed during one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.statements = {}  # SQL text -> [executions, total seconds, slowest seconds]
+        self.slow = []  # (time, duration ms, one-line SQL) over the slow-query threshold
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total += duration
+        stats = self.statements.get(statement)
+        if stats is None:
+            self.statements[statement] = [1, duration, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+    def slowest(self, limit=5):
+        """(statement, executions, total seconds, slowest seconds), slowest first"""
+        rows = [(sql, count, total, worst) for sql, (count, total, worst) in self.statements.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)[:limit]
+
+    def repeated(self, threshold):
+        """Statements run at least ``threshold`` times, usually a lazy load inside a loop"""
+        rows = [(sql, count, total) for sql, (count, total, _) in self.statements.items() if count >= threshold]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+
+def current_profile():
+    """The profile for the current request, or None outside a request"""
+    if not has_request_context():
+        return None
+    if 'query_profile' not in g:
+        g.query_profile = QueryProfile()
+    return g.query_profile
+
+
+def current_settings():
+    """Profiler settings of the current app, or the defaults outside one"""
+    if has_app_context():
+        return current_app.extensions.get('profiler', DEFAULT_SETTINGS)
+    return DEFAULT_SETTINGS
+
+
+def _one_line(statement):
+    return re.sub(r'\s+', ' ', statement).strip()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    profile = current_profile()
+    if profile is not None:
+        profile.record(statement, duration)
+
+    duration_ms = duration * 1000
+    settings = current_settings()
+    if duration_ms >= settings['slow_query_ms']:
+        endpoint = request.endpoint if has_request_context() else None
+        sql = _one_line(statement)
+        if profile is not None:
+            profile.slow.append((datetime.now(timezone.utc), round(duration_ms, 2), sql))
+        settings['logger'].warning('Slow query (%.1f ms): %s', duration_ms, sql,
+                       extra={'duration_ms': round(duration_ms, 2), 'endpoint': endpoint})
+
+
+def _report(response):
+    profile = g.get('query_profile')
+    if profile is None:
+        return response
+
+    settings = current_settings()
+    repeated = profile.repeated(settings['n_plus_one_threshold'])
+    for sql, count, total in repeated:
+        settings['logger'].warning('Possible N+1: statement ran %d times on %s: %s', count, request.endpoint, _one_line(sql),
+                       extra={'executions': count, 'db_ms': round(total * 1000, 2), 'endpoint': request.endpoint})
+
+    if settings['headers']:
+        response.headers['Server-Timing'] = f'db;dur={profile.total * 1000:.2f};desc="{profile.count} queries"'
+        response.headers['X-Query-Count'] = str(profile.count)
+
+    if (settings['panel'] and response.status_code == 200 and response.mimetype == 'text/html'
+            and not response.is_streamed):
+        panel = render_template('partials/sql_profiler.html', profile=profile,
+                                slowest=[(_one_line(sql), count, total, worst)
+                                         for sql, count, total, worst in profile.slowest()],
+                                repeated=[(_one_line(sql), count, total) for sql, count, total in repeated],
+                                slow_queries=profile.slow[-5:])
+        body = response.get_data(as_text=True)
+        if '</body>' in body:
+            response.set_data(body.replace('</body>', panel + '</body>', 1))
+    return response
+
+
+def init_app(app):
+    """Apply SQL_PROFILER_* settings and report each request's profile"""
+    app.extensions['profiler'] = {
+        'slow_query_ms': app.config.get('SQL_SLOW_QUERY_MS', 200),
+        'n_plus_one_threshold': app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5),
+        'headers': app.config.get('SQL_PROFILER_HEADERS', app.debug),
+        'panel': app.config.get('SQL_PROFILER_PANEL', app.debug),
+        'logger': app.logger.getChild('sql'),
+    }
+    app.after_request(_report)
@@ -0,0 +1,166 @@
+"""
+Rate limiting for Cost Calculation System
+Token buckets kept server side, either in process (bounded LRU that drops
+idle keys) or in a Redis-compatible server shared by all workers. Each key
+stores only its token count and last update time.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+
+class MemoryRateLimiter:
+    """In-process token buckets, bounded to ``max_keys`` entries"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated, idle_after)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        """Take ``cost`` tokens from a bucket refilling at ``rate`` per second.
+
+        Returns (allowed, seconds until enough tokens are available). A
+        negative ``cost`` gives tokens back, up to ``capacity``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.pop(key, (capacity, now, 0))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens = min(capacity, tokens - cost)
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            # A bucket idle for capacity / rate seconds is full again, i.e. the same as no entry
+            self._buckets[key] = (tokens, now, capacity / rate)
+            self._evict(now)
+        return allowed, retry_after
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _evict(self, now):
+        # Oldest updates come first, so stop at the first bucket still refilling
+        while self._buckets:
+            key, (_, updated, idle_after) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - updated < idle_after:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Atomic refill-and-take; the key expires once the bucket would be full again
+_CONSUME_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = math.min(capacity, tokens - cost)
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets in a Redis-compatible server shared by all workers"""
+
+    def __init__(self, url, prefix='cost_calc'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATELIMIT_BACKEND=redis requires the redis package (pip install redis)')
+        self._client = redis.Redis.from_url(url)
+        self._consume = self._client.register_script(_CONSUME_SCRIPT)
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f'{self.prefix}:ratelimit:{key}'
+
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, retry_after = self._consume(keys=[self._key(key)], args=[capacity, rate, time.time(), cost])
+        return bool(allowed), float(retry_after)
+
+    def reset(self, key):
+        self._client.delete(self._key(key))
+
+
+_backend = MemoryRateLimiter()
+
+
+def get_limiter():
+    """The current app's rate limit backend, or the process default outside an app"""
+    if has_app_context():
+        return current_app.extensions.get('ratelimit', _backend)
+    return _backend
+
+
+def set_limiter(backend, app=None):
+    """Replace the backend of ``app``, or the process default when no app is given"""
+    global _backend
+    if app is not None:
+        app.extensions['ratelimit'] = backend
+    else:
+        _backend = backend
+
+
+def init_app(app):
+    """Configure the rate limit backend from RATELIMIT_* settings"""
+    backend = app.config.get('RATELIMIT_BACKEND', 'memory')
+    if backend == 'redis':
+        set_limiter(RedisRateLimiter(app.config['RATELIMIT_REDIS_URL'], prefix=app.config.get('CACHE_KEY_PREFIX', 'cost_calc')), app)
+    elif backend == 'memory':
+        set_limiter(MemoryRateLimiter(max_keys=app.config.get('RATELIMIT_MAX_KEYS', 10000)), app)
+    else:
+        raise ValueError(f'Unknown RATELIMIT_BACKEND: {backend}')
+
+
+class Limit:
+    """At most ``attempts`` hits per ``period`` seconds per identifier, with bursts up to ``attempts``"""
+
+    def __init__(self, name, attempts, period):
+        self.name = name
+        self.capacity = attempts
+        self.rate = attempts / period
+
+    def hit(self, identifier):
+        return get_limiter().consume(f'{self.name}:{identifier}', self.capacity, self.rate)
+
+    def refund(self, identifier):
+        """Give back the token taken by a hit that should not count"""
+        get_limiter().consume(f'{self.name}:{identifier}', self.capacity, self.rate, cost=-1)
+
+    def reset(self, identifier):
+        get_limiter().reset(f'{self.name}:{identifier}')
+
+
+def hit_all(*checks):
+    """Hit (limit, identifier) pairs in order, stopping at the first one over its limit.
+
+    Returns (allowed, retry_after in whole seconds); limits after a rejection
+    are not charged.
+    """
+    for limit, identifier in checks:
+        allowed, retry_after = limit.hit(identifier)
+        if not allowed:
+            return False, math.ceil(retry_after)
+    return True, 0
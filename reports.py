@@ -0,0 +1,130 @@
+"""
+Cost analytics for Cost Calculation System
+Per-category, per-period and per-destination rollups computed with
+GROUP BY in the database and cached by (user, range, granularity).
+Cost reports group the cost_daily_total rollup rather than raw costs, so
+their cost depends on the number of active days, not the number of costs.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Float, String, func, type_coerce
+
+from aggregates import data_version
+from cache import cached, make_key
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+REPORT_CACHE_TTL = 600
+
+
+def period_bucket(column, granularity, dialect):
+    """SQL expression truncating a date column to the start of its period"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Invalid granularity: {granularity}')
+    if granularity == 'day':
+        # The rollup is already daily; grouping by the column itself stays on the primary key.
+        # SQLite stores dates as ISO text, so skip the Python-side date parsing there.
+        return type_coerce(column, String) if dialect == 'sqlite' else column
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc(granularity, column), 'YYYY-MM-DD')
+    if dialect == 'sqlite':
+        if granularity == 'week':
+            # Monday of the week, matching date_trunc('week')
+            return func.date(column, '-6 days', 'weekday 1')
+        pattern = {'day': '%Y-%m-%d', 'month': '%Y-%m-01', 'year': '%Y-01-01'}[granularity]
+        return func.strftime(pattern, column)
+    raise ValueError(f'Unsupported database for period reports: {dialect}')
+
+
+def _period(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _number(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value or 0
+
+
+def _filter_range(query, column, start, end):
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column <= end)
+    return query
+
+
+def _sum(column):
+    """SUM() returned as float; JSON output does not need Decimal precision"""
+    return type_coerce(func.sum(column), Float)
+
+
+def _category_label(category):
+    return category or 'Uncategorized'
+
+
+def costs_by_category(session, daily_model, user_id, start=None, end=None, granularity=None):
+    """Cost count and total per category"""
+    total = _sum(daily_model.cost_total)
+    query = session.query(daily_model.category, func.sum(daily_model.cost_count), total).filter(
+        daily_model.user_id == user_id)
+    query = _filter_range(query, daily_model.day, start, end)
+    rows = query.group_by(daily_model.category).order_by(total.desc()).all()
+    return [{'category': _category_label(category), 'count': int(count), 'total': _number(amount)}
+            for category, count, amount in rows]
+
+
+def costs_by_period(session, daily_model, user_id, start=None, end=None, granularity='month'):
+    """Cost count and total per day, week, month or year"""
+    bucket = period_bucket(daily_model.day, granularity, session.get_bind().dialect.name).label('period')
+    query = session.query(bucket, func.sum(daily_model.cost_count), _sum(daily_model.cost_total)).filter(
+        daily_model.user_id == user_id)
+    query = _filter_range(query, daily_model.day, start, end)
+    rows = query.group_by(bucket).order_by(bucket).all()
+    return [{'period': _period(period), 'count': int(count), 'total': _number(amount)}
+            for period, count, amount in rows]
+
+
+def costs_by_category_and_period(session, daily_model, user_id, start=None, end=None, granularity='month'):
+    """Cost totals per category within each period"""
+    bucket = period_bucket(daily_model.day, granularity, session.get_bind().dialect.name).label('period')
+    query = session.query(bucket, daily_model.category, _sum(daily_model.cost_total)).filter(
+        daily_model.user_id == user_id)
+    query = _filter_range(query, daily_model.day, start, end)
+    rows = query.group_by(bucket, daily_model.category).order_by(bucket).all()
+    return [{'period': _period(period), 'category': _category_label(category), 'total': _number(amount)}
+            for period, category, amount in rows]
+
+
+def tours_by_destination(session, tour_model, user_id, start=None, end=None, granularity=None):
+    """Tour count and total cost per destination"""
+    query = session.query(
+        tour_model.destination, func.count(tour_model.id), func.sum(tour_model.total_cost)
+    ).filter(tour_model.user_id == user_id)
+    query = _filter_range(query, tour_model.start_date, start, end)
+    rows = query.group_by(tour_model.destination).order_by(func.count(tour_model.id).desc()).all()
+    return [{'destination': destination or 'Unspecified', 'count': count, 'total': _number(total)}
+            for destination, count, total in rows]
+
+
+# Report name -> (function, model it runs over)
+REPORTS = {
+    'costs-by-category': (costs_by_category, 'daily'),
+    'costs-by-period': (costs_by_period, 'daily'),
+    'costs-by-category-and-period': (costs_by_category_and_period, 'daily'),
+    'tours-by-destination': (tours_by_destination, 'tour'),
+}
+
+
+def run_report(name, session, models, user_id, start=None, end=None, granularity='month'):
+    """Run a named report, serving repeat requests from the cache.
+
+    The key includes the user's data version (``models['summary']`` row),
+    so new costs or tours make earlier results unreachable instead of stale.
+    """
+    report, model_name = REPORTS[name]
+    key = make_key('report', name, user_id, data_version(session, models['summary'], user_id), start, end, granularity)
+    return cached(key, lambda: report(session, models[model_name], user_id, start, end, granularity),
+                  ttl=REPORT_CACHE_TTL)
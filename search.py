@@ -0,0 +1,151 @@
+"""
+Full-text search for Cost Calculation System
+Ranked search over cost and tour program text, backed by an expression
+GIN index on to_tsvector() in PostgreSQL and an FTS5 table kept in step by
+triggers in SQLite. Both indexes follow every write, ORM or bulk.
+"""
+
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import column, func, literal_column, select, table, text
+
+# Search name -> (table, indexed text columns, per-column FTS5 bm25 weights, result columns)
+SEARCHES = {
+    'costs': ('cost', ('name', 'description', 'category'), (10.0, 1.0, 5.0),
+              ('id', 'name', 'category', 'amount', 'currency', 'date')),
+    'tours': ('tour_program', ('name', 'description', 'destination'), (10.0, 1.0, 5.0),
+              ('id', 'name', 'destination', 'start_date', 'end_date', 'total_cost')),
+}
+
+# 'simple' does no stemming, which suits mixed English/Turkish text
+TEXT_SEARCH_CONFIG = 'simple'
+
+# Ranked results are paged by offset; keep deep pages bounded
+MAX_PAGE = 50
+MAX_TERMS = 8
+
+_TERM = re.compile(r'\w+')
+
+
+def _fts_table(table_name):
+    return f'{table_name}_fts'
+
+
+def _tsvector(table_name, columns, qualified=True):
+    """to_tsvector() over the text columns, spelled exactly like the index expression"""
+    prefix = f'{table_name}.' if qualified else ''
+    document = " || ' ' || ".join(f"coalesce({prefix}{name}, '')" for name in columns)
+    return f"to_tsvector('{TEXT_SEARCH_CONFIG}', {document})"
+
+
+def index_statements(dialect):
+    """DDL creating and backfilling the search indexes; idempotent"""
+    statements = []
+    for table_name, columns, _, _ in SEARCHES.values():
+        if dialect == 'postgresql':
+            statements.append(f'CREATE INDEX IF NOT EXISTS ix_{table_name}_search ON {table_name} '
+                              f'USING GIN ({_tsvector(table_name, columns, qualified=False)})')
+        elif dialect == 'sqlite':
+            fts = _fts_table(table_name)
+            names = ', '.join(columns)
+            new = ', '.join(f'new.{name}' for name in columns)
+            old = ', '.join(f'old.{name}' for name in columns)
+            insert_new = f'INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new});'
+            delete_old = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+            statements += [
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table_name}', "
+                f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table_name} BEGIN {insert_new} END',
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table_name} BEGIN {delete_old} END',
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table_name} '
+                f'BEGIN {delete_old} {insert_new} END',
+                f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+            ]
+    return statements
+
+
+@contextmanager
+def deferred_index(engine):
+    """Pause per-row index maintenance for a bulk load and rebuild the index once afterwards.
+
+    Only SQLite needs it: its FTS5 triggers are dropped during the load and
+    recreated, with a full rebuild, when the block exits.
+    """
+    if engine.dialect.name != 'sqlite':
+        yield
+        return
+    with engine.begin() as connection:
+        for table_name, _, _, _ in SEARCHES.values():
+            for event in ('insert', 'delete', 'update'):
+                connection.execute(text(f'DROP TRIGGER IF EXISTS {_fts_table(table_name)}_{event}'))
+    try:
+        yield
+    finally:
+        with engine.begin() as connection:
+            for statement in index_statements('sqlite'):
+                connection.execute(text(statement))
+
+
+def parse_terms(query):
+    """Split user input into at most MAX_TERMS lowercase word terms"""
+    return [term.lower() for term in _TERM.findall(query or '')][:MAX_TERMS]
+
+
+class SearchPage:
+    """One page of ranked search results"""
+
+    def __init__(self, items, page, per_page, has_next):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def next_page(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def prev_page(self):
+        return self.page - 1 if self.has_prev else None
+
+
+def search(session, name, source, user_id, query, page=1, per_page=10):
+    """Rank one user's rows matching every term of ``query`` as a word prefix.
+
+    ``source`` is the Table searched under ``name``.
+    """
+    table_name, columns, weights, fields = SEARCHES[name]
+    page = min(max(page, 1), MAX_PAGE)
+    terms = parse_terms(query)
+    if not terms:
+        return SearchPage([], page, per_page, False)
+
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        vector = literal_column(_tsvector(table_name, columns))
+        tsquery = func.to_tsquery(literal_column(f"'{TEXT_SEARCH_CONFIG}'"), ' & '.join(f'{term}:*' for term in terms))
+        rank = func.ts_rank(vector, tsquery)
+        statement = select(*(source.c[field] for field in fields)).where(vector.op('@@')(tsquery))
+        ordering = rank.desc()
+    elif dialect == 'sqlite':
+        fts = table(_fts_table(table_name), column('rowid'))
+        match = ' '.join(f'"{term}"*' for term in terms)
+        rank = func.bm25(literal_column(fts.name), *weights)
+        statement = (select(*(source.c[field] for field in fields))
+                     .select_from(fts.join(source, source.c.id == fts.c.rowid))
+                     .where(literal_column(fts.name).op('MATCH')(match)))
+        # bm25() is lower for better matches
+        ordering = rank
+    else:
+        raise ValueError(f'Unsupported database for full-text search: {dialect}')
+
+    statement = (statement.where(source.c.user_id == user_id)
+                 .order_by(ordering, source.c.id.desc())
+                 .limit(per_page + 1).offset((page - 1) * per_page))
+    rows = [dict(row._mapping) for row in session.execute(statement)]
+    return SearchPage(rows[:per_page], page, per_page, len(rows) > per_page)
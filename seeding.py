@@ -0,0 +1,215 @@
+"""
+Synthetic data seeding for Cost Calculation System
+Generates users, costs and tours column by column in large batches and
+loads them with PostgreSQL COPY where the driver supports it, or a single
+executemany per batch otherwise. Used by ``init_db.py --costs ...`` for
+capacity tests with millions of rows.
+"""
+
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select
+
+from currency import BASE_CURRENCY
+
+DEFAULT_BATCH_SIZE = 50000
+# Share of generated costs linked to one of the generated tours
+DEFAULT_TOUR_SHARE = 0.5
+
+# name -> relative weight
+DEFAULT_CATEGORIES = {'Travel': 30, 'Accommodation': 25, 'Food': 25, 'Transport': 10, 'Other': 10}
+DEFAULT_DESTINATIONS = {'Istanbul, Turkey': 35, 'Cappadocia, Turkey': 20, 'Antalya, Turkey': 20,
+                        'Izmir, Turkey': 15, 'Bodrum, Turkey': 10}
+
+COST_NAMES = {
+    'Travel': ['Flight Tickets', 'Train Tickets', 'Bus Tickets'],
+    'Accommodation': ['Hotel Accommodation', 'Guest House', 'Apartment Rental'],
+    'Food': ['Meals', 'Group Dinner', 'Breakfast'],
+    'Transport': ['Airport Transfer', 'Car Rental', 'Taxi'],
+    'Other': ['Museum Tickets', 'Guide Fee', 'Insurance'],
+}
+
+COST_COLUMNS = ['name', 'description', 'amount', 'currency', 'amount_base', 'category', 'date', 'user_id',
+                'tour_program_id', 'created_at']
+TOUR_COLUMNS = ['name', 'description', 'start_date', 'end_date', 'destination', 'total_cost', 'user_id', 'created_at']
+
+
+def parse_distribution(value):
+    """Parse 'Travel=30,Food=20' into {'Travel': 30.0, 'Food': 20.0}; a bare name weighs 1"""
+    distribution = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip():
+            distribution[name.strip()] = float(weight or 1)
+    if not distribution:
+        raise ValueError('Distribution must name at least one value')
+    return distribution
+
+
+class SeedReport:
+    """Rows loaded by a seeding run"""
+
+    def __init__(self):
+        self.users = 0
+        self.costs = 0
+        self.tours = 0
+        self.seconds = 0.0
+        self.user_ids = []
+        self.tour_ids = []
+
+    @property
+    def rows(self):
+        return self.users + self.costs + self.tours
+
+    @property
+    def rows_per_minute(self):
+        return int(self.rows / self.seconds * 60) if self.seconds else 0
+
+
+def _sizes(count, batch_size):
+    for offset in range(0, count, batch_size):
+        yield min(batch_size, count - offset)
+
+
+def generate_costs(rng, count, user_ids, start, days, categories, tours=(), tour_share=DEFAULT_TOUR_SHARE,
+                   batch_size=DEFAULT_BATCH_SIZE):
+    """Yield batches of cost rows (tuples in COST_COLUMNS order).
+
+    About ``tour_share`` of the costs are linked to one of ``tours``
+    ((id, user_id) pairs) and owned by that tour's user. Amounts are in
+    the base currency, so amount_base equals amount.
+    """
+    names, weights = list(categories), list(categories.values())
+    now = datetime.now(timezone.utc)
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    for size in _sizes(count, batch_size):
+        picked = rng.choices(names, weights, k=size)
+        owners = rng.choices(user_ids, k=size)
+        picked_days = rng.choices(dates, k=size)
+        links = rng.choices(tours, k=size) if tours else [None] * size
+        linked = [rng.random() < tour_share for _ in range(size)] if tours else [False] * size
+        amounts = [rng.randint(500, 250000) / 100 for _ in range(size)]
+        yield [
+            (rng.choice(COST_NAMES.get(category, [category])), None, amount, BASE_CURRENCY, amount,
+             category, day, tour[1] if link else owner, tour[0] if link else None, now)
+            for category, owner, day, tour, link, amount in zip(picked, owners, picked_days, links, linked, amounts)
+        ]
+
+
+def generate_tours(rng, count, user_ids, start, days, destinations, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield batches of tour rows (tuples in TOUR_COLUMNS order); total_cost is rolled up later"""
+    names, weights = list(destinations), list(destinations.values())
+    now = datetime.now(timezone.utc)
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    for size in _sizes(count, batch_size):
+        picked = rng.choices(names, weights, k=size)
+        owners = rng.choices(user_ids, k=size)
+        starts = rng.choices(dates, k=size)
+        lengths = rng.choices(range(1, 15), k=size)
+        yield [
+            (f"{destination.split(',')[0]} Tour", None, begin, begin + timedelta(days=length), destination,
+             0, owner, now)
+            for destination, owner, begin, length in zip(picked, owners, starts, lengths)
+        ]
+
+
+def _copy(connection, table, columns, rows):
+    """Load rows with COPY ... FROM STDIN; returns False when the driver cannot"""
+    cursor = connection.connection.dbapi_connection.cursor()
+    preparer = connection.dialect.identifier_preparer
+    statement = (f"COPY {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) "
+                 f"FROM STDIN WITH (FORMAT csv)")
+    try:
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+        elif hasattr(cursor, 'copy'):  # psycopg 3
+            with cursor.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            return False
+    finally:
+        cursor.close()
+    return True
+
+
+def _executemany(connection, table, columns, rows):
+    paramstyle = connection.dialect.paramstyle
+    if paramstyle in ('qmark', 'format', 'pyformat'):
+        placeholder = '?' if paramstyle == 'qmark' else '%s'
+        preparer = connection.dialect.identifier_preparer
+        connection.exec_driver_sql(
+            f"INSERT INTO {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) "
+            f"VALUES ({', '.join([placeholder] * len(columns))})", rows)
+    else:
+        connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+def load(engine, table, columns, batches):
+    """Insert each batch in its own transaction; returns the number of rows"""
+    use_copy = engine.dialect.name == 'postgresql'
+    total = 0
+    for rows in batches:
+        with engine.begin() as connection:
+            if not (use_copy and _copy(connection, table, columns, rows)):
+                use_copy = False
+                _executemany(connection, table, columns, rows)
+        total += len(rows)
+    return total
+
+
+def create_users(engine, user_table, count):
+    """Insert ``count`` synthetic users; returns their ids"""
+    if not count:
+        return []
+    with engine.begin() as connection:
+        first = (connection.execute(select(func.max(user_table.c.id))).scalar() or 0) + 1
+        now = datetime.now(timezone.utc)
+        connection.execute(insert(user_table), [
+            {'username': f'seed_user{number}', 'email': f'seed_user{number}@example.com', 'first_name': 'Seed',
+             'last_name': f'User {number}', 'department': 'Operations', 'is_active': True, 'created_at': now}
+            for number in range(first, first + count)
+        ])
+        return list(connection.execute(
+            select(user_table.c.id).where(user_table.c.id >= first).order_by(user_table.c.id)).scalars())
+
+
+def seed(engine, user_table, cost_table, tour_table, owner_ids=(), users=0, costs=0, tours=0,
+         start=None, days=365, categories=None, destinations=None, tour_share=DEFAULT_TOUR_SHARE,
+         batch_size=DEFAULT_BATCH_SIZE, random_seed=None):
+    """Create ``users`` users and spread ``costs`` and ``tours`` over them and ``owner_ids``.
+
+    Tours are loaded first so costs can be linked to them; the caller
+    recomputes the tour totals from ``report.tour_ids``.
+    """
+    rng = random.Random(random_seed)
+    start = start or date.today() - timedelta(days=days - 1)
+    report = SeedReport()
+    started = time.perf_counter()
+
+    user_ids = report.user_ids = list(owner_ids) + create_users(engine, user_table, users)
+    report.users = users
+    if not user_ids:
+        raise ValueError('Seeding costs and tours needs at least one user')
+
+    with engine.connect() as connection:
+        first_tour = (connection.execute(select(func.max(tour_table.c.id))).scalar() or 0) + 1
+    report.tours = load(engine, tour_table, TOUR_COLUMNS,
+                        generate_tours(rng, tours, user_ids, start, days, destinations or DEFAULT_DESTINATIONS, batch_size))
+    with engine.connect() as connection:
+        new_tours = [tuple(row) for row in connection.execute(
+            select(tour_table.c.id, tour_table.c.user_id).where(tour_table.c.id >= first_tour))]
+    report.tour_ids = [tour_id for tour_id, _ in new_tours]
+
+    report.costs = load(engine, cost_table, COST_COLUMNS,
+                        generate_costs(rng, costs, user_ids, start, days, categories or DEFAULT_CATEGORIES,
+                                       new_tours, tour_share, batch_size))
+    report.seconds = time.perf_counter() - started
+    return report
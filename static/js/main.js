@@ -25,6 +25,7 @@ function initializeApp() {
     initializeAnimations();
     initializeKeyboardShortcuts();
     initializePerformanceOptimizations();
+    initializeReportCharts();
 }
 
 // Modern Sidebar Management
@@ -705,10 +706,10 @@ $(document).ajaxError(function(event, xhr, settings, thrownError) {
 });
 
 // Utility Functions
-function formatCurrency(amount) {
+function formatCurrency(amount, currency) {
     return new Intl.NumberFormat('en-US', {
         style: 'currency',
-        currency: 'USD'
+        currency: currency || 'USD'
     }).format(amount);
 }
 
@@ -732,6 +733,39 @@ function debounce(func, wait) {
     };
 }
 
+// Report charts rendered from the JSON reporting API
+function initializeReportCharts() {
+    $('[data-report]').each(function() {
+        const container = $(this);
+        const labelField = container.data('label-field') || 'category';
+        
+        $.getJSON('/api/reports/' + container.data('report'), function(response) {
+            if (response.status !== 'success' || !response.data.length) {
+                container.html('<p class="text-muted small mb-0">-</p>');
+                return;
+            }
+            
+            const max = Math.max(...response.data.map(row => row.total));
+            // Periods come oldest first; show the latest eight rather than the first
+            const shown = container.data('rows') === 'latest' ? response.data.slice(-8) : response.data.slice(0, 8);
+            const rows = shown.map(function(row) {
+                const width = max > 0 ? Math.round(row.total / max * 100) : 0;
+                // Totals arrive converted to the user's display currency, named in response.currency
+                const amount = formatCurrency(row.total, response.currency);
+                return $('<div class="mb-2"></div>').append(
+                    $('<div class="d-flex justify-content-between small"></div>')
+                        .append($('<span></span>').text(row[labelField]))
+                        .append($('<span class="fw-medium"></span>').text(amount)),
+                    $('<div class="progress" style="height: 6px;"></div>').attr('title', row[labelField] + ': ' + amount).append(
+                        $('<div class="progress-bar"></div>').css('width', width + '%')
+                    )
+                );
+            });
+            container.empty().append(rows);
+        });
+    });
+}
+
 // Export functions for global use
 window.CostCalculationApp = {
     showAlert,
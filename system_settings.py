@@ -0,0 +1,157 @@
+"""
+System settings for Cost Calculation System
+Registry of the settings stored in the system_setting table. All rows are
+read in one query, converted to typed values with the validation schemas
+and kept in process memory until the table's version changes, so reading
+settings costs one small aggregate query per request.
+"""
+
+from datetime import date
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from validation import Field, FieldError, Schema
+
+MAX_ITEMS_PER_PAGE = 100
+
+
+class Setting:
+    """A registered setting.
+
+    The default comes from ``config_default`` in the app config when set,
+    else ``default``; ``config_choices`` names the config list the value
+    must be one of.
+    """
+
+    def __init__(self, field, default, description, config_default=None, config_choices=None):
+        self.field = field
+        self.name = field.name
+        self.default = default
+        self.description = description
+        self.config_default = config_default
+        self.config_choices = config_choices
+
+    def default_for(self, config):
+        if self.config_default:
+            return config.get(self.config_default) or self.default
+        return self.default
+
+
+SETTINGS = [
+    Setting(Field('items_per_page', 'integer', label='Items per page', max_length=3,
+                  minimum=1, maximum=MAX_ITEMS_PER_PAGE),
+            10, 'Number of items per page in listings'),
+    Setting(Field('date_format', label='Date format', max_length=50), '%Y-%m-%d', 'Default date format'),
+    Setting(Field('default_language', label='Default language', max_length=10), 'en', 'Default system language',
+            config_default='DEFAULT_LANGUAGE', config_choices='SUPPORTED_LANGUAGES'),
+    Setting(Field('currency', 'currency', label='Currency'), 'USD', 'Default currency for costs',
+            config_default='DEFAULT_CURRENCY', config_choices='SUPPORTED_CURRENCIES'),
+]
+
+
+def _valid_date_format(data):
+    value = data['date_format']
+    try:
+        valid = '%' in value and date(2000, 1, 31).strftime(value) != value
+    except ValueError:
+        valid = False
+    if not valid:
+        return FieldError('date_format', 'invalid', 'Date format: Use strftime codes such as %Y-%m-%d')
+    return None
+
+
+SETTINGS_SCHEMA = Schema([setting.field for setting in SETTINGS],
+                         checks=[(('date_format',), _valid_date_format)])
+
+
+class SystemSettings:
+    """Typed setting values, read as attributes; ``version`` is the table version they were loaded at"""
+
+    def __init__(self, values, version=None):
+        self.__dict__.update(values)
+        self.version = version
+
+    def values(self):
+        return {setting.name: getattr(self, setting.name) for setting in SETTINGS}
+
+    def __repr__(self):
+        return f'<SystemSettings {self.__dict__}>'
+
+
+def parse(raw, config):
+    """Convert raw string values by setting name; returns ({name: typed value}, [FieldError]).
+
+    Missing and invalid values get the setting's default.
+    """
+    errors, data = SETTINGS_SCHEMA.validate(raw)
+    for setting in SETTINGS:
+        value = data[setting.name]
+        if value is not None and setting.config_choices and value not in config.get(setting.config_choices, ()):
+            errors.append(FieldError(setting.name, 'invalid', f'{setting.field.label}: {value} is not available'))
+    failed = {error.field for error in errors}
+    values = {setting.name: setting.default_for(config) if data[setting.name] is None or setting.name in failed
+              else data[setting.name] for setting in SETTINGS}
+    return values, errors
+
+
+def load(connection, table, config, version=None):
+    """Read every setting row in one query and return SystemSettings"""
+    raw = dict(connection.execute(select(table.c.key, table.c.value)).all())
+    values, errors = parse(raw, config)
+    for error in errors:
+        current_app.logger.warning(f"Ignoring system setting {error.field}: {error.message}")
+    return SystemSettings(values, version)
+
+
+def defaults(config):
+    """SystemSettings holding every setting's default, without touching the database"""
+    return SystemSettings(parse({}, config)[0])
+
+
+def settings_version(connection, table):
+    """Version of the system_setting table: its row count and latest update.
+
+    Read from the table itself, so a change saved by any worker or CLI
+    process is seen by every other process on its next request.
+    """
+    return tuple(connection.execute(select(func.count(), func.max(table.c.updated_at))).one())
+
+
+def get_settings(connection, table):
+    """The app's SystemSettings, reloaded only when the table's version has changed.
+
+    ``connection`` is a Session or Connection; ``table`` is the
+    system_setting Table. Within a request the version is read once. When
+    the table cannot be read the defaults are used, so pages (error pages
+    included) still render.
+    """
+    if has_request_context() and 'system_settings' in g:
+        return g.system_settings
+    holder = current_app.extensions.setdefault('system_settings', {})
+    try:
+        version = settings_version(connection, table)
+        settings = holder.get('settings')
+        if settings is None or settings.version != version:
+            settings = holder['settings'] = load(connection, table, current_app.config, version)
+    except SQLAlchemyError as e:
+        current_app.logger.warning(f"System settings unavailable, using defaults: {e}")
+        settings = defaults(current_app.config)
+    if has_request_context():
+        g.system_settings = settings
+    return settings
+
+
+def save(session, model, values):
+    """Store typed ``values`` by setting name on ``session``; the caller commits"""
+    rows = {row.key: row for row in session.execute(select(model)).scalars()}
+    for setting in SETTINGS:
+        if setting.name not in values:
+            continue
+        row = rows.get(setting.name)
+        if row is None:
+            row = model(key=setting.name, description=setting.description)
+            session.add(row)
+        row.value = str(values[setting.name])
+
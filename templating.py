@@ -0,0 +1,52 @@
+"""
+Template compilation for Cost Calculation System
+Stores compiled Jinja templates in a filesystem bytecode cache shared by
+every worker, so a fresh process loads templates with marshal instead of
+parsing and compiling them. precompile() fills the cache at deploy time.
+"""
+
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def cache_directory(app):
+    """Absolute bytecode cache directory for an app, or None when disabled"""
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if not directory:
+        return None
+    return os.path.join(app.root_path, directory)
+
+
+def init_app(app):
+    """Attach the bytecode cache to the app's Jinja environment"""
+    directory = cache_directory(app)
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        app.logger.warning(f"Jinja bytecode cache disabled: {str(e)}")
+        return
+    if not os.access(directory, os.W_OK):
+        app.logger.warning(f"Jinja bytecode cache disabled: {directory} is not writable")
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def precompile(app):
+    """Compile every template into the bytecode cache.
+
+    Returns (compiled template names, [(name, error)]); syntax errors are
+    reported instead of surfacing on the first request that renders them.
+    """
+    environment = app.jinja_env
+    compiled, failed = [], []
+    for name in environment.list_templates():
+        try:
+            environment.get_template(name)
+        except Exception as e:
+            failed.append((name, e))
+        else:
+            compiled.append(name)
+    return compiled, failed
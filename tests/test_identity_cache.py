@@ -0,0 +1,40 @@
+"""current_user served from the identity cache"""
+
+from flask_login import current_user, login_user
+
+import cache
+from app import create_app
+from extensions import db
+from models import CachedUser, User, user_cache_key
+
+
+def test_cached_user_keeps_is_active():
+    assert CachedUser({'id': 1, 'username': 'a', 'is_active': False}).is_active is False
+    assert CachedUser({'id': 1, 'username': 'a', 'is_active': True}).is_active is True
+
+
+def test_deactivated_user_is_inactive_through_the_cache():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    with app.app_context():
+        user = User.query.filter_by(username='admin').first()
+        user.is_active = False
+        db.session.commit()
+        user_id = user.id
+
+    # UserMixin.is_authenticated follows is_active: the first request caches the
+    # deactivated row, the second is served from the cache, and both are refused
+    for _ in range(2):
+        with client:
+            response = client.get('/settings')
+            assert response.status_code == 302 and '/login' in response.location
+            assert current_user.is_authenticated is False
+        with app.app_context():
+            assert cache.get_cache().get(user_cache_key(user_id))['is_active'] is False
+
+    with app.test_request_context():
+        assert login_user(CachedUser({'id': user_id, 'username': 'admin', 'is_active': False})) is False
@@ -0,0 +1,61 @@
+"""Upgrading a database created by the original schema"""
+
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+
+from migrations import MIGRATIONS, apply_migrations
+
+BASELINE_SCHEMA = [
+    'CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, '
+    'email VARCHAR(120) NOT NULL UNIQUE, first_name VARCHAR(50) NOT NULL, last_name VARCHAR(50) NOT NULL, '
+    'department VARCHAR(100), position VARCHAR(100), is_active BOOLEAN, created_at DATETIME, last_login DATETIME)',
+    'CREATE TABLE cost (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, description TEXT, '
+    'amount NUMERIC(10, 2) NOT NULL, category VARCHAR(100), date DATE NOT NULL, '
+    'user_id INTEGER NOT NULL REFERENCES user (id), created_at DATETIME)',
+    'CREATE TABLE tour_program (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, description TEXT, '
+    'start_date DATE NOT NULL, end_date DATE NOT NULL, destination VARCHAR(200), total_cost NUMERIC(10, 2), '
+    'user_id INTEGER NOT NULL REFERENCES user (id), created_at DATETIME)',
+    'CREATE TABLE system_setting (id INTEGER PRIMARY KEY, "key" VARCHAR(100) NOT NULL UNIQUE, value TEXT, '
+    'description VARCHAR(200), created_at DATETIME, updated_at DATETIME)',
+]
+
+
+def baseline_engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "baseline.db"}')
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO user (id, username, email, first_name, last_name) "
+                                "VALUES (1, 'admin', 'admin@example.com', 'Admin', 'User')"))
+        connection.execute(text("INSERT INTO tour_program (id, name, start_date, end_date, total_cost, user_id) VALUES "
+                                "(1, 'Cappadocia', '2024-05-01', '2024-05-04', 1234.50, 1), "
+                                "(2, 'Izmir', '2024-06-01', '2024-06-02', NULL, 1)"))
+        connection.execute(text("INSERT INTO cost (name, amount, date, user_id) VALUES ('Hotel', 300, '2024-05-01', 1)"))
+    return engine
+
+
+def test_upgrade_keeps_hand_entered_tour_totals(tmp_path):
+    engine = baseline_engine(tmp_path)
+
+    assert apply_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+
+    with engine.connect() as connection:
+        rows = connection.execute(text('SELECT id, total_cost, opening_total FROM tour_program ORDER BY id')).all()
+    assert [(id, Decimal(str(total or 0)), Decimal(str(opening))) for id, total, opening in rows] == [
+        (1, Decimal('1234.5'), Decimal('1234.5')),
+        (2, Decimal('0'), Decimal('0')),
+    ]
+
+
+def test_linked_costs_add_to_the_opening_total(tmp_path):
+    from tourcosts import recompute
+    from models import Cost, TourProgram
+
+    engine = baseline_engine(tmp_path)
+    apply_migrations(engine)
+    with engine.begin() as connection:
+        connection.execute(text('UPDATE cost SET tour_program_id = 1'))
+        recompute(connection, TourProgram.__table__, Cost.__table__)
+        total = connection.execute(text('SELECT total_cost FROM tour_program WHERE id = 1')).scalar()
+    assert Decimal(str(total)) == Decimal('1534.5')
@@ -0,0 +1,93 @@
+"""
+Tour cost rollups for Cost Calculation System
+TourProgram.total_cost is the tour's opening_total (a total entered by hand
+before costs could be linked) plus the sum of the costs linked to it, in the
+base currency (Cost.amount_base). ORM writes to costs adjust it
+incrementally; recompute() rebuilds it for any number of tours with one
+set-based UPDATE.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import Float, event, func, select, type_coerce, update
+
+from aggregates import changed_value, keep_history
+
+# Tour ids per UPDATE ... WHERE id IN (...), well below SQLite's bound parameter limit
+RECOMPUTE_CHUNK_SIZE = 5000
+
+
+def apply_tour_delta(connection, tours, tour_id, amount):
+    """Add ``amount`` to one tour's total_cost on the caller's connection"""
+    if tour_id is None or not amount:
+        return
+    connection.execute(
+        update(tours).where(tours.c.id == tour_id)
+        .values(total_cost=func.coalesce(tours.c.total_cost, 0) + Decimal(str(amount)))
+    )
+
+
+def recompute(connection, tours, costs, tour_ids=None):
+    """Recompute total_cost from opening_total and the linked costs; all tours when ``tour_ids`` is None.
+
+    Each tour's sum is a correlated subquery served by the
+    (tour_program_id, category, amount_base) index, so no cost rows leave the
+    database. Returns the number of tours updated.
+    """
+    linked_total = (
+        select(func.coalesce(func.sum(costs.c.amount_base), 0))
+        .where(costs.c.tour_program_id == tours.c.id)
+        .scalar_subquery()
+    )
+    statement = update(tours).values(total_cost=tours.c.opening_total + linked_total)
+    if tour_ids is None:
+        return connection.execute(statement).rowcount
+
+    tour_ids = list(tour_ids)
+    updated = 0
+    for offset in range(0, len(tour_ids), RECOMPUTE_CHUNK_SIZE):
+        chunk = tour_ids[offset:offset + RECOMPUTE_CHUNK_SIZE]
+        updated += connection.execute(statement.where(tours.c.id.in_(chunk))).rowcount
+    return updated
+
+
+def breakdown(session, cost_model, tour_id):
+    """Cost count and total per category for one tour, largest first"""
+    total = type_coerce(func.sum(cost_model.amount_base), Float)
+    rows = session.execute(
+        select(cost_model.category, func.count(), total)
+        .where(cost_model.tour_program_id == tour_id)
+        .group_by(cost_model.category)
+        .order_by(total.desc())
+    ).all()
+    return [{'category': category or 'Uncategorized', 'count': count, 'total': amount or 0}
+            for category, count, amount in rows]
+
+
+def register_listeners(cost_model, tour_model):
+    """Keep tour totals in step with ORM writes to costs.
+
+    Bulk Core inserts of linked costs bypass these hooks and must call
+    apply_tour_delta() or recompute() themselves.
+    """
+    tours = tour_model.__table__
+
+    # Load the old value on assignment so after_update can subtract it from the old tour
+    keep_history(cost_model.amount, cost_model.tour_program_id, cost_model.tour_program)
+
+    @event.listens_for(cost_model, 'after_insert')
+    def cost_inserted(mapper, connection, target):
+        apply_tour_delta(connection, tours, target.tour_program_id, target.amount_base)
+
+    @event.listens_for(cost_model, 'after_delete')
+    def cost_deleted(mapper, connection, target):
+        apply_tour_delta(connection, tours, target.tour_program_id, -Decimal(str(target.amount_base)))
+
+    @event.listens_for(cost_model, 'after_update')
+    def cost_updated(mapper, connection, target):
+        old_tour, new_tour = changed_value(target, 'tour_program_id')
+        old_amount, new_amount = changed_value(target, 'amount_base')
+        if old_tour == new_tour and old_amount == new_amount:
+            return
+        apply_tour_delta(connection, tours, old_tour, -Decimal(str(old_amount)))
+        apply_tour_delta(connection, tours, new_tour, new_amount)
@@ -0,0 +1,86 @@
+"""
+Translation catalog for Cost Calculation System
+Loads each language file on first use and serves lookups from memory
+"""
+
+import json
+import os
+import threading
+
+LANGUAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'languages')
+DEFAULT_LANGUAGE = 'en'
+
+
+class TranslationCatalog:
+    """Process-wide cache of the JSON files in ``languages/``.
+
+    Each file is parsed once and re-read only when its mtime changes.
+    Missing keys fall back to the default language, then to the key itself.
+    """
+
+    def __init__(self, directory=LANGUAGES_DIR, default_language=DEFAULT_LANGUAGE):
+        self.directory = directory
+        self.default_language = default_language
+        self._catalogs = {}
+        self._mtimes = {}
+        self._lock = threading.RLock()
+
+    def _path(self, lang_code):
+        return os.path.join(self.directory, f'{lang_code}.json')
+
+    def load_all(self):
+        """Load every language file found in the directory"""
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                self._load(filename[:-len('.json')])
+
+    def _load(self, lang_code):
+        path = self._path(lang_code)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        if self._mtimes.get(lang_code) == mtime:
+            return self._catalogs[lang_code]
+
+        with self._lock:
+            if self._mtimes.get(lang_code) != mtime:
+                with open(path, 'r', encoding='utf-8') as f:
+                    catalog = json.load(f)
+                # Merge over the default language so each lookup is a single dict hit
+                if lang_code != self.default_language:
+                    fallback = self._catalogs.get(self.default_language) or self._load(self.default_language) or {}
+                    catalog = {**fallback, **catalog}
+                self._catalogs[lang_code] = catalog
+                self._mtimes[lang_code] = mtime
+                if lang_code == self.default_language:
+                    # Other languages were merged with the old default; rebuild them lazily
+                    for code in list(self._mtimes):
+                        if code != lang_code:
+                            self._mtimes[code] = None
+        return self._catalogs[lang_code]
+
+    def get_catalog(self, lang_code):
+        """Return the translations for a language, reloading it if the file changed"""
+        catalog = self._load(lang_code)
+        if catalog is None:
+            catalog = self._load(self.default_language) or {}
+        return catalog
+
+    def gettext(self, key, lang_code=DEFAULT_LANGUAGE):
+        """Get translation for given key and language"""
+        return self.get_catalog(lang_code).get(key, key)
+
+    def lookup(self, lang_code):
+        """Return a ``_()`` function bound to one language for use in templates"""
+        catalog = self.get_catalog(lang_code)
+        return lambda key: catalog.get(key, key)
+
+    def languages(self):
+        """Codes of all available languages"""
+        self.load_all()
+        return sorted(self._catalogs)
+
+
+catalog = TranslationCatalog()
@@ -0,0 +1,252 @@
+"""
+Input validation for Cost Calculation System
+Declarative field schemas shared by the web forms, the report API and the
+bulk import tools. Each Schema compiles its fields once into a list of
+converter functions, so validating a form or a batch of thousands of
+import rows is one pass over the fields per row with precompiled patterns
+and one parse per value.
+
+Values are stored as entered apart from surrounding whitespace and control
+characters; HTML escaping happens at render time (Jinja autoescaping) and
+spreadsheet escaping in exports.py.
+"""
+
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+CURRENCY_PATTERN = re.compile(r'[A-Za-z]{3}')
+
+# C0 control characters other than tab and newlines, and DEL, removed with one str.translate()
+# (only run for the rare values that are not isprintable())
+CONTROL_CHARACTERS = dict.fromkeys([code for code in range(32) if chr(code) not in '\t\n\r'] + [127])
+
+# Cost.amount is Numeric(10, 2)
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class FieldError:
+    """One validation failure: the field, a machine-readable code and the message shown to users"""
+
+    __slots__ = ('field', 'code', 'message')
+
+    def __init__(self, field, code, message):
+        self.field = field
+        self.code = code
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f'<FieldError {self.field}:{self.code}>'
+
+    def as_dict(self):
+        return {'field': self.field, 'code': self.code, 'message': self.message}
+
+
+class Invalid(Exception):
+    """Raised by a converter; carries the error code and message"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _text(max_length):
+    def convert(value):
+        if len(value) > max_length:
+            raise Invalid('too_long', f'Input too long. Maximum {max_length} characters allowed.')
+        return value
+    return convert
+
+
+def _email(max_length):
+    check_length = _text(max_length)
+
+    def convert(value):
+        value = check_length(value)
+        if not EMAIL_PATTERN.fullmatch(value):
+            raise Invalid('invalid', 'Invalid email format')
+        return value
+    return convert
+
+
+def _decimal(max_length):
+    def convert(value):
+        if len(value) > max_length:
+            raise Invalid('too_long', f'Input too long. Maximum {max_length} characters allowed.')
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            raise Invalid('invalid', 'Invalid numeric value')
+        if not number.is_finite():
+            raise Invalid('invalid', 'Invalid numeric value')
+        return number
+    return convert
+
+
+def _integer(max_length):
+    def convert(value):
+        if len(value) > max_length or not value.isdigit():
+            raise Invalid('invalid', 'Invalid number')
+        return int(value)
+    return convert
+
+
+def _date(max_length):
+    def convert(value):
+        if not DATE_PATTERN.fullmatch(value):
+            raise Invalid('invalid', 'Invalid date format. Use YYYY-MM-DD')
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise Invalid('invalid', 'Invalid date format. Use YYYY-MM-DD')
+    return convert
+
+
+def _currency(max_length):
+    def convert(value):
+        if not CURRENCY_PATTERN.fullmatch(value):
+            raise Invalid('invalid', 'Use a three-letter currency code such as USD')
+        return value.upper()
+    return convert
+
+
+CONVERTERS = {
+    'text': _text,
+    'email': _email,
+    'decimal': _decimal,
+    'integer': _integer,
+    'date': _date,
+    'currency': _currency,
+}
+
+
+class Field:
+    """Declaration of one input field.
+
+    ``minimum``/``maximum`` bound numbers and dates; ``required_message``
+    and ``minimum_message`` replace the default wording for those failures.
+    """
+
+    def __init__(self, name, type='text', label=None, required=False, max_length=255,
+                 minimum=None, maximum=None, required_message=None, minimum_message=None):
+        if type not in CONVERTERS:
+            raise ValueError(f'Unknown field type: {type}')
+        self.name = name
+        self.type = type
+        self.label = label or name.replace('_', ' ').capitalize()
+        self.required = required
+        self.max_length = max_length
+        self.minimum = minimum
+        self.maximum = maximum
+        self.required_message = required_message or f'{self.label} is required'
+        self.minimum_message = minimum_message or f'{self.label}: Must be at least {minimum}'
+
+    def compile(self):
+        """Return a function mapping a raw value to (value, FieldError or None)"""
+        name, label, required = self.name, self.label, self.required
+        convert = CONVERTERS[self.type](self.max_length)
+        minimum, maximum = self.minimum, self.maximum
+        minimum_error = FieldError(name, 'too_small', self.minimum_message)
+        required_error = FieldError(name, 'required', self.required_message)
+
+        def validate(raw):
+            if raw is None or raw == '':
+                return None, required_error if required else None
+            value = str(raw).strip()
+            if not value.isprintable():
+                value = value.translate(CONTROL_CHARACTERS)
+            if not value:
+                return None, required_error if required else None
+            try:
+                value = convert(value)
+            except Invalid as e:
+                return None, FieldError(name, e.code, f'{label}: {e.message}')
+            if minimum is not None and value < minimum:
+                return None, minimum_error
+            if maximum is not None and value > maximum:
+                return None, FieldError(name, 'too_large', f'{label}: Must be at most {maximum}')
+            return value, None
+        return validate
+
+
+class Schema:
+    """A set of fields plus cross-field checks, compiled once at construction.
+
+    A check is called as ``check(data)`` after every field has converted
+    and returns a FieldError or None; it is skipped when a field it needs
+    (``requires``) is missing or invalid.
+    """
+
+    def __init__(self, fields, checks=()):
+        self.fields = list(fields)
+        self._validators = [(field.name, field.compile()) for field in self.fields]
+        self._checks = [(tuple(requires), check) for requires, check in checks]
+
+    def validate(self, form_data):
+        """Validate one mapping; returns ([FieldError], {name: typed value or None})"""
+        errors = []
+        data = {}
+        get = form_data.get
+        for name, validate in self._validators:
+            value, error = validate(get(name))
+            data[name] = value
+            if error is not None:
+                errors.append(error)
+        for requires, check in self._checks:
+            if all(data[name] is not None for name in requires):
+                error = check(data)
+                if error is not None:
+                    errors.append(error)
+        return errors, data
+
+    def validate_many(self, rows):
+        """Yield (index, errors, data) for each mapping in ``rows``"""
+        validate = self.validate
+        for index, row in enumerate(rows):
+            errors, data = validate(row)
+            yield index, errors, data
+
+
+def _end_after_start(data):
+    if data['end_date'] <= data['start_date']:
+        return FieldError('end_date', 'before_start', 'End date must be after start date')
+    return None
+
+
+POSITIVE_AMOUNT = 'Amount must be a positive number'
+
+COST_SCHEMA = Schema([
+    Field('name', required=True, max_length=200),
+    Field('amount', 'decimal', required=True, minimum=Decimal('0'), maximum=MAX_AMOUNT,
+          required_message=POSITIVE_AMOUNT, minimum_message=POSITIVE_AMOUNT),
+    Field('currency', 'currency'),
+    Field('date', 'date', required=True),
+    Field('description', max_length=1000),
+    Field('category', max_length=100),
+    Field('tour_program_id', 'integer', label='Tour program', max_length=18),
+])
+
+TOUR_SCHEMA = Schema([
+    Field('name', required=True, max_length=200),
+    Field('start_date', 'date', required=True),
+    Field('end_date', 'date', required=True),
+    Field('description', max_length=1000),
+    Field('destination', max_length=200),
+], checks=[(('start_date', 'end_date'), _end_after_start)])
+
+DATE_RANGE_SCHEMA = Schema([
+    Field('start', 'date', label='Start date'),
+    Field('end', 'date', label='End date'),
+])
+
+# Listing exports: a date range plus the listing's own filter column
+EXPORT_SCHEMAS = {
+    'category': Schema(DATE_RANGE_SCHEMA.fields + [Field('category', max_length=200)]),
+    'destination': Schema(DATE_RANGE_SCHEMA.fields + [Field('destination', max_length=200)]),
+}
@@ -0,0 +1,676 @@
+"""
+Views for Cost Calculation System
+Routes, request hooks and error handlers, registered on an app by
+create_app() through init_app().
+"""
+
+from flask import render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, g, current_app
+from sqlalchemy import select
+from flask_login import login_user, login_required, logout_user, current_user
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from markupsafe import Markup
+import os
+import hashlib
+import time
+from translations import catalog
+from pagination import keyset_paginate
+from exports import EXPORT_FORMATS, stream_query
+import aggregates
+import imports
+import reports
+import tourcosts
+import search
+import system_settings
+import cache
+import currency
+import ratelimit
+import dbpool
+from extensions import db, login_manager
+from models import (User, Cost, TourProgram, UserSummary, CostDailyTotal, ExchangeRate, SystemSetting,
+                    CACHED_USER_FIELDS, CachedUser, user_cache_key)
+from validation import COST_SCHEMA, DATE_RANGE_SCHEMA, EXPORT_SCHEMAS, TOUR_SCHEMA, FieldError
+
+# URL rules collected at import time and added to each app by init_app()
+_routes = []
+
+def route(rule, **options):
+    def decorator(view):
+        _routes.append((rule, view, options))
+        return view
+    return decorator
+
+def read_session():
+    """Session for listings: the read-only pool when configured, else db.session"""
+    return current_app.extensions.get('read_session') or db.session
+
+def current_rates():
+    """Exchange rates, served from memory until they change"""
+    return currency.get_rates(db.session, ExchangeRate.__table__)
+
+def current_settings():
+    """Typed system settings, served from memory until they change"""
+    return system_settings.get_settings(db.session, SystemSetting.__table__)
+
+def data_version():
+    """Version of the current user's data, read from the database so every worker agrees"""
+    return aggregates.data_version(db.session, UserSummary, current_user.id)
+
+def current_language():
+    return session.get('language') or current_settings().default_language
+
+def display_currency():
+    return currency.display_currency(current_settings().currency)
+
+# Template filters for amounts and dates
+def money(amount, code=None):
+    """Format an amount in ``code``; without a code, a base-currency total shown in the display currency"""
+    if code is None:
+        code, factor = currency.display_factor(current_rates(), display_currency())
+        amount = Decimal(str(amount or 0)) * factor
+    return currency.format_money(amount, code)
+
+def format_date(value):
+    """Format a date with the date_format system setting"""
+    return value.strftime(current_settings().date_format) if value else ''
+
+# Security headers
+def after_request(response):
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['X-Frame-Options'] = 'DENY'
+    response.headers['X-XSS-Protection'] = '1; mode=block'
+    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+    # The CDN hosts stay allowed: vendored assets fall back to them until `build-assets --fetch` has run
+    response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://code.jquery.com https://cdnjs.cloudflare.com; style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://cdnjs.cloudflare.com; img-src 'self' data:; font-src 'self' https://cdnjs.cloudflare.com;"
+    
+    # Conditional GET: private, always revalidated with the ETag from check_etag()
+    etag = g.get('etag')
+    if etag and response.status_code == 200:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Conditional GET support
+def conditional_get(view):
+    """Mark a view whose output depends only on the user's data, language and session"""
+    view.conditional_get = True
+    return view
+
+def page_etag():
+    """Weak ETag for the current user's view of a page"""
+    parts = [
+        current_app.config.get('APP_VERSION'),
+        [getattr(current_user, name, None) for name in CACHED_USER_FIELDS],
+        data_version(),
+        current_language(),
+        display_currency(),
+        current_rates().version,
+        current_settings().version,
+        # Pages embed a CSRF token; change the tag before a cached token can expire
+        session.get('csrf_token'),
+    ]
+    csrf_time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if csrf_time_limit:
+        parts.append(int(time.time() // (csrf_time_limit / 2)))
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def check_etag():
+    """Answer If-None-Match with 304 before the view queries or renders anything"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, 'conditional_get', False) or not current_user.is_authenticated:
+        return None
+    # Pending flash messages are only shown by a fresh render
+    if session.get('_flashes'):
+        return None
+    
+    g.etag = page_etag()
+    if request.if_none_match.contains_weak(g.etag):
+        response = Response(status=304)
+        response.set_etag(g.etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+# Translations are served from an in-memory catalog
+def load_language(lang_code):
+    """Load language file for given language code"""
+    return catalog.get_catalog(lang_code)
+
+def get_translation(key, lang='en'):
+    """Get translation for given key and language"""
+    return catalog.gettext(key, lang)
+
+def cached_user():
+    """The logged-in user from the identity cache only, or None on a miss"""
+    user_id = session.get('_user_id')
+    fields = cache.get_cache().get(user_cache_key(int(user_id))) if user_id else None
+    return CachedUser(fields) if fields is not None else None
+
+@login_manager.user_loader
+def load_user(user_id):
+    key = user_cache_key(int(user_id))
+    fields = cache.get_cache().get(key)
+    if fields is None:
+        row = db.session.execute(
+            select(*(getattr(User, name) for name in CACHED_USER_FIELDS)).where(User.id == int(user_id))
+        ).first()
+        if row is None:
+            return None
+        fields = dict(row._mapping)
+        cache.get_cache().set(key, fields, current_app.config.get('USER_CACHE_TTL', 60))
+    return CachedUser(fields)
+
+# Context processor for translations
+def inject_translations():
+    lang = current_language()
+    return dict(_=catalog.lookup(lang), current_language=lang, system_settings=current_settings())
+
+# Export helpers
+def parse_export_args(filter_field):
+    """Validate export format, date range and the listing-specific filter"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        flash('Invalid export format', 'error')
+        return None, None
+    
+    errors, filters = EXPORT_SCHEMAS[filter_field].validate(request.args)
+    if errors:
+        flash(f'Export: {errors[0]}', 'error')
+        return None, None
+    return export_format, filters
+
+def export_response(name, export_format, header, rows):
+    """Stream an export as a file download"""
+    mimetype, extension, generate = EXPORT_FORMATS[export_format]
+    filename = f"{name}_{datetime.now(timezone.utc).strftime('%Y%m%d')}.{extension}"
+    return Response(
+        stream_with_context(generate(header, rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+# Authentication routes
+def login_limits():
+    """Per-IP and per-username login limits from the current app's config"""
+    config = current_app.config
+    period = config.get('LOGIN_ATTEMPT_PERIOD', 300)
+    return (ratelimit.Limit('login:ip', config.get('LOGIN_ATTEMPTS_PER_IP', 20), period),
+            ratelimit.Limit('login:user', config.get('LOGIN_ATTEMPTS_PER_USER', 5), period))
+
+@route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '').strip()
+        
+        # Basic validation
+        if not username or not password:
+            flash('Username and password are required', 'error')
+            return render_template('auth/login.html')
+        
+        # Rate limiting per client IP and per username, checked before any DB work.
+        # Every attempt takes a token; a successful login gives them back below
+        login_ip_limit, login_user_limit = login_limits()
+        client_ip = request.remote_addr or 'unknown'
+        allowed, retry_after = ratelimit.hit_all(
+            (login_ip_limit, client_ip),
+            (login_user_limit, username.lower()),
+        )
+        if not allowed:
+            flash(f'Too many login attempts. Please try again in {max(1, retry_after)} seconds.', 'error')
+            return render_template('auth/login.html'), 429
+        
+        # For now, using test user (in production, this would be LDAP)
+        if username == 'admin' and password == 'admin123':
+            user = User.query.filter_by(username=username).first()
+            if not user:
+                # Create test user if doesn't exist
+                user = User(
+                    username='admin',
+                    email='admin@example.com',
+                    first_name='Admin',
+                    last_name='User',
+                    department='IT',
+                    position='System Administrator'
+                )
+                db.session.add(user)
+                db.session.commit()
+            
+            login_user(user)
+            user.last_login = datetime.now(timezone.utc)
+            db.session.commit()
+            login_user_limit.reset(username.lower())  # Reset on successful login
+            login_ip_limit.refund(client_ip)  # Only failures count against a shared IP
+            flash('Login successful!', 'success')
+            return redirect(url_for('dashboard'))
+        else:
+            flash('Invalid username or password', 'error')
+    
+    return render_template('auth/login.html')
+
+@route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('You have been logged out', 'info')
+    return redirect(url_for('login'))
+
+# Main routes
+@route('/')
+@login_required
+@conditional_get
+def dashboard():
+    # Statistics and recent activity only change with the user's data, so the
+    # rendered fragment is cached under the user's data version
+    key = cache.make_key('fragment', 'dashboard_activity', current_user.id, current_language(), display_currency(),
+                         current_rates().version, current_settings().version, data_version())
+    activity = cache.cached(key, render_dashboard_activity)
+    return render_template('dashboard.html', activity=Markup(activity))
+
+def render_dashboard_activity():
+    """Render the dashboard statistics cards and recent activity tables"""
+    total_costs, cost_count, total_tours = aggregates.user_totals(db.session, UserSummary, current_user.id)
+    recent_costs = Cost.query.filter_by(user_id=current_user.id).order_by(Cost.created_at.desc()).limit(5).all()
+    recent_tours = TourProgram.query.filter_by(user_id=current_user.id).order_by(TourProgram.created_at.desc()).limit(5).all()
+    
+    return render_template('partials/dashboard_activity.html',
+                         total_costs=total_costs,
+                         total_tours=total_tours,
+                         recent_costs=recent_costs,
+                         recent_tours=recent_tours)
+
+@route('/costs')
+@login_required
+@conditional_get
+def costs():
+    cursor = request.args.get('cursor')
+    costs = keyset_paginate(read_session().query(Cost).filter_by(user_id=current_user.id), (Cost.date, Cost.id),
+                            cursor=cursor, per_page=current_settings().items_per_page, with_total=True)
+    return render_template('costs/index.html', costs=costs)
+
+@route('/costs/export')
+@login_required
+def export_costs():
+    export_format, filters = parse_export_args('category')
+    if export_format is None:
+        return redirect(url_for('costs'))
+    
+    query = db.session.query(Cost.date, Cost.name, Cost.category, Cost.amount, Cost.currency, Cost.description).filter(
+        Cost.user_id == current_user.id)
+    if filters['start']:
+        query = query.filter(Cost.date >= filters['start'])
+    if filters['end']:
+        query = query.filter(Cost.date <= filters['end'])
+    if filters['category']:
+        query = query.filter(Cost.category == filters['category'])
+    query = stream_query(query.order_by(Cost.date, Cost.id))
+    
+    header = ['Date', 'Name', 'Category', 'Amount', 'Currency', 'Description']
+    return export_response('costs', export_format, header, query)
+
+# Tours offered in the add-cost form, most recent first
+TOUR_CHOICES_LIMIT = 100
+
+def tour_choices():
+    return db.session.execute(
+        select(TourProgram.id, TourProgram.name, TourProgram.start_date)
+        .where(TourProgram.user_id == current_user.id)
+        .order_by(TourProgram.start_date.desc(), TourProgram.id.desc())
+        .limit(TOUR_CHOICES_LIMIT)
+    ).all()
+
+def render_cost_form():
+    return render_template('costs/add.html', tours=tour_choices(), currencies=currency.supported_currencies(),
+                           default_currency=current_settings().currency)
+
+@route('/costs/add', methods=['GET', 'POST'])
+@login_required
+def add_cost():
+    if request.method == 'POST':
+        # Validate form data
+        errors, validated_data = COST_SCHEMA.validate(request.form)
+        
+        code = validated_data['currency'] or current_settings().currency
+        if code not in currency.supported_currencies() or not current_rates().has(code):
+            errors.append(FieldError('currency', 'no_rate', f'Currency: No exchange rate for {code}'))
+        
+        # Costs can only be linked to the user's own tours
+        tour_program_id = validated_data['tour_program_id']
+        if tour_program_id and not db.session.execute(
+                select(TourProgram.id).where(TourProgram.id == tour_program_id,
+                                             TourProgram.user_id == current_user.id)).first():
+            errors.append(FieldError('tour_program_id', 'not_found', 'Tour program not found'))
+        
+        if errors:
+            for error in errors:
+                flash(error, 'error')
+            return render_cost_form()
+        
+        try:
+            cost = Cost(
+                name=validated_data['name'],
+                description=validated_data['description'],
+                amount=validated_data['amount'],
+                currency=code,
+                category=validated_data['category'],
+                date=validated_data['date'],
+                tour_program_id=tour_program_id,
+                user_id=current_user.id
+            )
+            db.session.add(cost)
+            db.session.commit()
+            flash('Cost added successfully!', 'success')
+            return redirect(url_for('costs'))
+        except Exception as e:
+            db.session.rollback()
+            flash('Error adding cost. Please try again.', 'error')
+            return render_cost_form()
+    
+    return render_cost_form()
+
+@route('/costs/import', methods=['GET', 'POST'])
+@login_required
+def import_costs():
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        file_format = imports.detect_format(upload.filename) if upload and upload.filename else None
+        if not file_format:
+            flash('Please upload a CSV, JSON or JSON Lines file', 'error')
+            return render_template('costs/import.html')
+        
+        report = imports.import_costs(
+            db.engine, Cost.__table__, UserSummary.__table__, CostDailyTotal.__table__, COST_SCHEMA.validate,
+            current_user.id, imports.read_rows(upload.stream, file_format), rates=current_rates()
+        )
+        if report.error:
+            line, message = report.error
+            current_app.logger.warning(f"Cost import stopped for user {current_user.id} after line {line}: {message}")
+            # Batches before the failure are committed; say how many rows made it in
+            where = f' after line {line}' if line else ''
+            flash(f'Could not read the uploaded file{where}. Imported {report.inserted} of {report.total} rows read.', 'error')
+        else:
+            flash(f'Imported {report.inserted} of {report.total} rows.', 'success' if not report.rejected else 'warning')
+        return render_template('costs/import.html', report=report)
+    
+    return render_template('costs/import.html')
+
+@route('/tour-programs')
+@login_required
+@conditional_get
+def tour_programs():
+    cursor = request.args.get('cursor')
+    tours = keyset_paginate(read_session().query(TourProgram).filter_by(user_id=current_user.id), (TourProgram.start_date, TourProgram.id),
+                            cursor=cursor, per_page=current_settings().items_per_page, with_total=True)
+    return render_template('tour_programs/index.html', tours=tours)
+
+@route('/tour-programs/export')
+@login_required
+def export_tour_programs():
+    export_format, filters = parse_export_args('destination')
+    if export_format is None:
+        return redirect(url_for('tour_programs'))
+    
+    query = db.session.query(TourProgram.start_date, TourProgram.end_date, TourProgram.name, TourProgram.destination,
+                             TourProgram.total_cost, TourProgram.description).filter(
+        TourProgram.user_id == current_user.id)
+    if filters['start']:
+        query = query.filter(TourProgram.start_date >= filters['start'])
+    if filters['end']:
+        query = query.filter(TourProgram.start_date <= filters['end'])
+    if filters['destination']:
+        query = query.filter(TourProgram.destination == filters['destination'])
+    query = stream_query(query.order_by(TourProgram.start_date, TourProgram.id))
+    
+    header = ['Start Date', 'End Date', 'Name', 'Destination', f'Total Cost ({currency.BASE_CURRENCY})', 'Description']
+    return export_response('tour_programs', export_format, header, query)
+
+@route('/tour-programs/add', methods=['GET', 'POST'])
+@login_required
+def add_tour_program():
+    if request.method == 'POST':
+        # Validate form data
+        errors, validated_data = TOUR_SCHEMA.validate(request.form)
+        
+        if errors:
+            for error in errors:
+                flash(error, 'error')
+            return render_template('tour_programs/add.html')
+        
+        try:
+            tour = TourProgram(
+                name=validated_data['name'],
+                description=validated_data['description'],
+                start_date=validated_data['start_date'],
+                end_date=validated_data['end_date'],
+                destination=validated_data['destination'],
+                user_id=current_user.id
+            )
+            db.session.add(tour)
+            db.session.commit()
+            flash('Tour program added successfully!', 'success')
+            return redirect(url_for('tour_programs'))
+        except Exception as e:
+            db.session.rollback()
+            flash('Error adding tour program. Please try again.', 'error')
+            return render_template('tour_programs/add.html')
+    
+    return render_template('tour_programs/add.html')
+
+@route('/api/tour-programs/<int:tour_id>/costs')
+@login_required
+@conditional_get
+def tour_cost_breakdown(tour_id):
+    tour = db.session.execute(
+        select(TourProgram.id, TourProgram.total_cost)
+        .where(TourProgram.id == tour_id, TourProgram.user_id == current_user.id)
+    ).first()
+    if tour is None:
+        return jsonify({'status': 'error', 'message': 'Tour program not found'}), 404
+    
+    rates = current_rates()
+    code, factor = currency.display_factor(rates, display_currency())
+    _, data = currency.display_rows(tourcosts.breakdown(db.session, Cost, tour.id), rates, code, 'total')
+    return jsonify({'status': 'success', 'tour_program_id': tour.id, 'currency': code,
+                    'total_cost': round(float(tour.total_cost or 0) * float(factor), 2), 'data': data})
+
+# Full-text search
+SEARCH_MODELS = {'costs': Cost, 'tours': TourProgram}
+
+def json_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def run_search():
+    """Search the current user's costs or tours from the q, type and page arguments"""
+    name = request.args.get('type', 'costs')
+    if name not in SEARCH_MODELS:
+        name = 'costs'
+    query = (request.args.get('q') or '').strip()[:200]
+    page = request.args.get('page', 1, type=int)
+    results = search.search(read_session(), name, SEARCH_MODELS[name].__table__, current_user.id, query, page=page,
+                            per_page=current_settings().items_per_page)
+    return name, query, results
+
+@route('/search')
+@login_required
+@conditional_get
+def search_page():
+    name, query, results = run_search()
+    return render_template('search/index.html', search_type=name, query=query, results=results)
+
+@route('/api/search')
+@login_required
+@conditional_get
+def search_api():
+    name, query, results = run_search()
+    items = [{key: json_value(value) for key, value in item.items()} for item in results.items]
+    response = {'status': 'success', 'type': name, 'query': query, 'page': results.page,
+                'has_next': results.has_next, 'data': items}
+    # Cost amounts keep their own currency; tour totals are shown in the display currency
+    if name == 'tours':
+        response['currency'], response['data'] = currency.display_rows(items, current_rates(), display_currency(), 'total_cost')
+    return jsonify(response)
+
+@route('/settings')
+@login_required
+def settings():
+    return render_template('settings/index.html')
+
+@route('/settings/system', methods=['GET', 'POST'])
+@login_required
+def settings_system():
+    if request.method == 'POST':
+        values, errors = system_settings.parse(request.form, current_app.config)
+        if errors:
+            for error in errors:
+                flash(error, 'error')
+            return render_settings_form(request.form)
+        
+        try:
+            system_settings.save(db.session, SystemSetting, values)
+            db.session.commit()
+            flash('Settings saved successfully!', 'success')
+            return redirect(url_for('settings_system'))
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Saving system settings failed: {str(e)}")
+            flash('Error saving settings. Please try again.', 'error')
+            return render_settings_form(request.form)
+    
+    return render_settings_form(current_settings().values())
+
+def render_settings_form(values):
+    return render_template('settings/system.html', values=values,
+                           languages=current_app.config.get('SUPPORTED_LANGUAGES', []),
+                           currencies=currency.supported_currencies())
+
+@route('/settings/users')
+@login_required
+def settings_users():
+    users = User.query.all()
+    return render_template('settings/users.html', users=users)
+
+@route('/settings/language', methods=['GET', 'POST'])
+@login_required
+def settings_language():
+    if request.method == 'POST':
+        language = request.form.get('language', 'en').strip()
+        
+        # Validate language code
+        allowed_languages = ['en', 'tr']
+        if language not in allowed_languages:
+            flash('Invalid language selection', 'error')
+            return redirect(url_for('settings_language'))
+        
+        session['language'] = language
+        flash('Language changed successfully!', 'success')
+        return redirect(url_for('settings_language'))
+    
+    return render_template('settings/language.html', current_lang=current_language(),
+                           currencies=currency.supported_currencies(), display_currency=display_currency())
+
+@route('/settings/currency', methods=['POST'])
+@login_required
+def settings_currency():
+    code = request.form.get('currency', '').strip().upper()
+    if code not in currency.supported_currencies() or not current_rates().has(code):
+        flash('Invalid currency selection', 'error')
+        return redirect(url_for('settings_language'))
+    
+    session['currency'] = code
+    flash('Display currency changed successfully!', 'success')
+    return redirect(url_for('settings_language'))
+
+# Reporting API
+REPORT_MODELS = {'cost': Cost, 'daily': CostDailyTotal, 'tour': TourProgram, 'summary': UserSummary}
+
+@route('/api/reports/<name>')
+@login_required
+@conditional_get
+def report_data(name):
+    if name not in reports.REPORTS:
+        return jsonify({'status': 'error', 'message': 'Unknown report'}), 404
+    
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in reports.GRANULARITIES:
+        return jsonify({'status': 'error', 'message': 'Invalid granularity'}), 400
+    errors, period = DATE_RANGE_SCHEMA.validate(request.args)
+    if errors:
+        return jsonify({'status': 'error', 'message': str(errors[0]),
+                        'errors': [error.as_dict() for error in errors]}), 400
+    
+    data = reports.run_report(
+        name, db.session, REPORT_MODELS, current_user.id,
+        start=period['start'], end=period['end'], granularity=granularity
+    )
+    # Cached results are in the base currency; convert the whole result in one pass
+    code, data = currency.display_rows(data, current_rates(), display_currency(), 'total')
+    return jsonify({'status': 'success', 'report': name, 'granularity': granularity, 'currency': code, 'data': data})
+
+# Connection pool metrics, per worker process
+@route('/api/metrics/pool')
+@login_required
+def pool_metrics():
+    return jsonify({'status': 'success', 'pid': os.getpid(), 'pool': dbpool.pool_status(db.engine)})
+
+# API routes for language switching
+@route('/api/change-language', methods=['POST'])
+@login_required
+def change_language():
+    try:
+        data = request.get_json()
+        if not data:
+            current_app.logger.warning("No JSON data provided")
+            return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+        
+        language = data.get('language', 'en').strip()
+        
+        # Validate language code
+        allowed_languages = ['en', 'tr']
+        if language not in allowed_languages:
+            current_app.logger.warning(f"Invalid language code: {language}")
+            return jsonify({'status': 'error', 'message': 'Invalid language'}), 400
+        
+        session['language'] = language
+        current_app.logger.debug("User %s changed language to %s", current_user.id, language)
+        return jsonify({'status': 'success', 'language': language})
+    except Exception as e:
+        current_app.logger.error(f"Language change error: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Server error'}), 500
+
+# Error handlers
+def render_error(template, status):
+    """Render an error page without querying the database, which may be what failed"""
+    if 'system_settings' not in g:
+        g.system_settings = system_settings.defaults(current_app.config)
+    # Flask-Login keeps the loaded user in g._login_user; fill it from the identity cache only
+    if '_login_user' not in g:
+        g._login_user = cached_user() or login_manager.anonymous_user()
+    return render_template(template), status
+
+def not_found_error(error):
+    return render_error('errors/404.html', 404)
+
+def internal_error(error):
+    db.session.rollback()
+    return render_error('errors/500.html', 500)
+
+def forbidden_error(error):
+    return render_error('errors/403.html', 403)
+
+def init_app(app):
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.before_request(check_etag)
+    app.after_request(after_request)
+    app.context_processor(inject_translations)
+    app.add_template_filter(money)
+    app.add_template_filter(format_date)
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_error)
+    app.register_error_handler(403, forbidden_error)